@@ -1,11 +1,24 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 import uvicorn
+import asyncio
+import multiprocessing
 import logging
+from contextlib import asynccontextmanager, contextmanager
+from concurrent.futures import ProcessPoolExecutor
+import os
+import orjson
 from dotenv import load_dotenv
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, Response
 from fastapi import status
+from playwright.async_api import async_playwright
+
+try:
+    import fcntl
+except ImportError:  # Optional; without it migrations rely on running before the workers start
+    fcntl = None
 
 # Import only document router (no auth needed)
 from routers import document
@@ -20,43 +33,147 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-from database import init_db
+from database import engine, init_db
+from utils.ttl_cache import ttl_cache
+from utils.qdrant_client import qdrant_client
+from utils.web_extractor import WebExtractor
+from migrations.init_database import run_migrations, SCHEMA_VERSION
 
 # Load environment variables
 load_dotenv()
 
+# Server processes sharing this machine; set by __main__ below, and read by
+# uvicorn's own CLI as its --workers default
+SERVER_WORKERS = int(os.getenv('WEB_CONCURRENCY', 1))
+
+def per_worker(total: int) -> int:
+    """Each server worker's share of a machine-wide process or concurrency budget"""
+    return max(1, total // SERVER_WORKERS)
+
+def _schema_version() -> int:
+    with engine.connect() as conn:
+        return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+@contextmanager
+def _migration_lock():
+    """Hold an exclusive lock next to the database file so one process migrates at a time"""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{engine.url.database}-lock", "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield  # Closing the file releases the lock
+
+# Apply the schema once per database instead of on every worker boot
+def apply_migrations():
+    if _schema_version() >= SCHEMA_VERSION:
+        return
+    
+    with _migration_lock():
+        # Another worker may have migrated while this one waited for the lock
+        current_version = _schema_version()
+        if current_version >= SCHEMA_VERSION:
+            return
+        
+        logger.info(f"Migrating database schema from version {current_version} to {SCHEMA_VERSION}")
+        run_migrations()
+        init_db()
+        with engine.connect() as conn:
+            conn.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            conn.commit()
+
+# Connect to Qdrant and load the embedding model before the first request
+def initialize_qdrant():
+    try:
+        if not qdrant_client.connect():
+            return
+        if not qdrant_client.initialize_collection():
+            return
+        qdrant_client.load_embedding_model()
+    except Exception as e:
+        logger.error(f"Failed to initialize Qdrant: {str(e)}")
+
+# Share one Chromium process across requests; each request gets its own context
+async def start_browser(app: FastAPI):
+    app.state.playwright = None
+    app.state.browser = None
+    app.state.browser_semaphore = asyncio.Semaphore(per_worker(os.cpu_count() or 1))
+    try:
+        app.state.playwright = await async_playwright().start()
+        app.state.browser = await app.state.playwright.chromium.launch()
+        logger.info("Started shared Chromium browser")
+    except Exception as e:
+        logger.error(f"Failed to start Chromium, URL rendering will be unavailable: {str(e)}")
+
+async def stop_browser(app: FastAPI):
+    if app.state.browser is not None:
+        await app.state.browser.close()
+    if app.state.playwright is not None:
+        await app.state.playwright.stop()
+
+# PDF parsing is pure-Python CPU work; run it in worker processes so uploads
+# parse in parallel instead of contending for this process's GIL. Spawned
+# rather than forked so workers don't inherit the loaded model and threads.
+# PDF_PARSE_WORKERS is the machine-wide total, split across server workers.
+def start_process_pool(app: FastAPI):
+    max_workers = per_worker(int(os.getenv('PDF_PARSE_WORKERS', os.cpu_count() or 1)))
+    app.state.process_pool = ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+    )
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    apply_migrations()
+    await asyncio.to_thread(initialize_qdrant)
+    await start_browser(app)
+    start_process_pool(app)
+    # Pooled HTTP/2 client for browserless page fetches
+    app.state.http_client = WebExtractor.create_http_client()
+    yield
+    await app.state.http_client.aclose()
+    app.state.process_pool.shutdown(cancel_futures=True)
+    await stop_browser(app)
+
 # Initialize FastAPI app
 app = FastAPI(
     title="Document Upload API",
-    description="Simple API for document upload and processing - no authentication required"
+    description="Simple API for document upload and processing - no authentication required",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["http://localhost:3000", "http://localhost:8000", "*"],
+    allow_origins=["http://localhost:3000", "http://localhost:8000"],
+    allow_origin_regex=r"^https?://localhost(:\d+)?$",
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
     allow_headers=["Content-Type", "Authorization", "X-Requested-With", "Accept"],
+    max_age=86400,
 )
 
+# Compress larger JSON bodies (search hits carry full chunk texts)
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 # Add exception handlers
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request, exc):
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
         content={"detail": str(exc)},
     )
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc):
-    logger.error(f"Exception during request: {request.method} {request.url}")
-    logger.error(f"Exception type: {type(exc).__name__}")
-    logger.error(f"Exception details: {str(exc)}")
-    import traceback
-    traceback.print_exc()
+    logger.exception(
+        "Unhandled exception",
+        exc_info=exc,
+        extra={"method": request.method, "url": str(request.url)},
+    )
     
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
         content={"detail": f"Internal server error: {str(exc)}"},
     )
@@ -64,25 +181,46 @@ async def general_exception_handler(request, exc):
 # Include only document router (no authentication required)
 app.include_router(document.router, prefix="/api/documents")
 
+# Probe endpoints are polled constantly; encode each body at most once a
+# second and let upstream balancers cache it for the same window
+PROBE_CACHE_HEADERS = {"Cache-Control": "max-age=1"}
+
+@ttl_cache(1.0)
+def _root_body() -> bytes:
+    return orjson.dumps({"message": "Welcome to Document Upload API - No Authentication Required"})
+
+@ttl_cache(1.0)
+def _health_body() -> bytes:
+    return orjson.dumps({"status": "healthy", "database": "local_documents.db"})
+
 # Basic routes
 @app.get("/", tags=["Root"])
 async def read_root():
-    return {"message": "Welcome to Document Upload API - No Authentication Required"}
+    return Response(_root_body(), media_type="application/json", headers=PROBE_CACHE_HEADERS)
 
 # Health check endpoint
 @app.get("/health", tags=["Health"])
 async def health_check():
-    return {"status": "healthy", "database": "local_documents.db"}
+    return Response(_health_body(), media_type="application/json", headers=PROBE_CACHE_HEADERS)
 
 # Run the application
 if __name__ == "__main__":
-    # Initialize the database
-    init_db()
+    # Auto-reload is for local development only and cannot be combined with workers
+    reload = os.getenv("UVICORN_RELOAD", "false").lower() == "true"
+    workers = 1 if reload else int(os.getenv("WEB_CONCURRENCY", max(2, os.cpu_count() or 1)))
+    # Inherited by the worker processes, which size their pools from it
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+    
+    # Migrate once here, before the workers start and each run the lifespan
+    apply_migrations()
     
     # Start the server
     uvicorn.run(
         "main:app", 
         host="0.0.0.0", 
         port=8000, 
-        reload=True
+        loop="uvloop",
+        http="httptools",
+        reload=reload,
+        workers=workers
     ) 
\ No newline at end of file
@@ -1,12 +1,18 @@
 from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Float, MetaData, Table, Text
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect, text
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.sql import func
 import os
+import sys
 from dotenv import load_dotenv
 import datetime
 
+# Also run directly as a script (python migrations/init_database.py), so
+# make the backend package importable
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database import _set_sqlite_pragmas
+
 # Load environment variables
 load_dotenv()
 
@@ -15,11 +21,57 @@ DATABASE_URL = "sqlite:///./local_documents.db"
 
 # Create engine
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+# Same connection PRAGMAs as database.py so table creation doesn't fall back
+# to the default rollback journal
+event.listen(engine, "connect", _set_sqlite_pragmas)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 # Create metadata instance
 metadata = MetaData()
 
+# Stored in PRAGMA user_version once the schema is fully applied; bump it
+# whenever a change needs the startup migration to run again
+SCHEMA_VERSION = 3
+
+# Indexes added after the tables first shipped; create_all skips tables that
+# already exist, so these are applied explicitly on existing databases
+EXTRA_INDEXES = {
+    "documents": "CREATE INDEX IF NOT EXISTS ix_documents_created_at ON documents (created_at DESC)",
+    "search_queries": "CREATE INDEX IF NOT EXISTS ix_sq_user_ts ON search_queries (user_id, search_timestamp)",
+}
+
+def create_missing_indexes():
+    """Create indexes that older databases are missing"""
+    existing_tables = set(inspect(engine).get_table_names())
+    with engine.begin() as conn:
+        for table_name, statement in EXTRA_INDEXES.items():
+            if table_name in existing_tables:
+                conn.execute(text(statement))
+
+# Timestamp columns switched from CURRENT_TIMESTAMP text to epoch integers;
+# SQLite sorts any TEXT above every INTEGER, so old rows are converted
+EPOCH_COLUMNS = {
+    "users": ("created_at",),
+    "documents": ("created_at",),
+    "document_chunks": ("created_at",),
+    "search_queries": ("search_timestamp",),
+    "vector_collections": ("created_at", "updated_at"),
+}
+
+def convert_text_timestamps():
+    """Rewrite timestamps stored as text by older databases as epoch seconds"""
+    existing_tables = set(inspect(engine).get_table_names())
+    with engine.begin() as conn:
+        for table_name, columns in EPOCH_COLUMNS.items():
+            if table_name not in existing_tables:
+                continue
+            for column in columns:
+                conn.execute(text(
+                    f"UPDATE {table_name} SET {column} = CAST(strftime('%s', {column}) AS INTEGER) "
+                    f"WHERE typeof({column}) = 'text' AND strftime('%s', {column}) IS NOT NULL"
+                ))
+
 def run_migrations():
     """Initialize database with complete documents table"""
     try:
@@ -34,7 +86,7 @@ def run_migrations():
             Column('file_path', String),
             Column('file_size', Integer),
             Column('content_type', String),
-            Column('created_at', DateTime, server_default=func.now(), nullable=False),
+            Column('created_at', Integer, nullable=False),  # Unix epoch seconds, set by the app
             # Vectorization fields
             Column('vectorization_status', String, default="pending"),  # pending, completed, failed
             Column('vectorization_error', Text, nullable=True),  # Store error details if vectorization fails
@@ -43,6 +95,8 @@ def run_migrations():
         
         # Create the table
         metadata.create_all(engine, tables=[documents], checkfirst=True)
+        create_missing_indexes()
+        convert_text_timestamps()
         
         print("Documents table created successfully with all fields")
         return True
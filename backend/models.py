@@ -1,9 +1,41 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Text, Enum as SQLEnum, Float
-from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
-from database import Base
+from sqlalchemy import event, select, Integer, String, ForeignKey, Text, Index, text, PrimaryKeyConstraint
+from sqlalchemy.types import TypeDecorator
+from sqlalchemy.orm import Mapped, mapped_column, relationship, validates
+from database import Base, engine
 import datetime
 from enum import Enum
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Iterable, NamedTuple, Optional
+
+# Timestamps are stored as Unix epoch seconds: 8-byte integers instead of
+# ISO-8601 text, with no string parsing when rows are loaded
+class EpochDateTime(TypeDecorator):
+    impl = Integer
+    cache_ok = True
+    
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, datetime.datetime):
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=datetime.timezone.utc)
+            return int(value.timestamp())
+        return int(value)
+    
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        if isinstance(value, str):
+            # Rows written before the switch hold CURRENT_TIMESTAMP text
+            return datetime.datetime.fromisoformat(value).replace(tzinfo=datetime.timezone.utc)
+        return datetime.datetime.fromtimestamp(value, tz=datetime.timezone.utc)
+
+# Python-side default: the instance keeps a datetime after flush, like a
+# loaded row, and the bind converts it to epoch seconds. Whole seconds, so
+# the in-memory value matches what is read back
+def _utc_now() -> datetime.datetime:
+    return datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
 
 # Optional user model for future authentication
 class UserRole(str, Enum):
@@ -13,17 +45,21 @@ class UserRole(str, Enum):
 class User(Base):
     __tablename__ = "users"
     
-    id = Column(Integer, primary_key=True, index=True)
-    email = Column(String, unique=True, index=True)
-    username = Column(String, unique=True, index=True)
-    password_hash = Column(String)
-    role = Column(SQLEnum(UserRole), default=UserRole.USER)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    is_active = Column(Boolean, default=True)
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    email: Mapped[Optional[str]] = mapped_column(unique=True, index=True)
+    username: Mapped[Optional[str]] = mapped_column(unique=True, index=True)
+    password_hash: Mapped[Optional[str]]
+    role: Mapped[str] = mapped_column(String(16), default=UserRole.USER.value)
+    created_at: Mapped[Optional[datetime.datetime]] = mapped_column(EpochDateTime, default=_utc_now)
+    is_active: Mapped[Optional[bool]] = mapped_column(default=True)
     
     # Relationships
-    documents = relationship("Document", back_populates="user")
-    search_queries = relationship("SearchQuery", back_populates="user")
+    documents: Mapped[List["Document"]] = relationship(back_populates="user", lazy="selectin")
+    search_queries: Mapped[List["SearchQuery"]] = relationship(back_populates="user", lazy="raise")  # Query explicitly
+    
+    @validates("role")
+    def _validate_role(self, key, value):
+        return UserRole(value).value
     
     def __repr__(self):
         return f"<User(id={self.id}, email={self.email}, role={self.role})>"
@@ -31,65 +67,86 @@ class User(Base):
 # Main document model (currently used in the app)
 class Document(Base):
     __tablename__ = "documents"
+    # Backs the newest-first /pdf-list ordering
+    __table_args__ = (
+        Index("ix_documents_created_at", text("created_at DESC")),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Optional for now
-    filename = Column(String, nullable=False)
-    original_filename = Column(String)
-    file_path = Column(String)
-    file_size = Column(Integer)
-    content_type = Column(String)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    vectorization_status = Column(String, default="pending")  # pending, completed, failed
-    vectorization_error = Column(Text, nullable=True)
-    chunks_count = Column(Integer, default=0)
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    user_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id"))  # Optional for now
+    filename: Mapped[str]
+    original_filename: Mapped[Optional[str]]
+    file_path: Mapped[Optional[str]]
+    file_size: Mapped[Optional[int]]
+    content_type: Mapped[Optional[str]]
+    created_at: Mapped[Optional[datetime.datetime]] = mapped_column(EpochDateTime, default=_utc_now)
+    vectorization_status: Mapped[Optional[str]] = mapped_column(default="pending")  # pending, completed, failed
+    vectorization_error: Mapped[Optional[str]] = mapped_column(Text, deferred=True)
+    chunks_count: Mapped[Optional[int]] = mapped_column(default=0)
     
     # Relationships
-    user = relationship("User", back_populates="documents")
-    chunks = relationship("DocumentChunk", back_populates="document", cascade="all, delete-orphan")
+    user: Mapped[Optional["User"]] = relationship(back_populates="documents")
+    chunks: Mapped[List["DocumentChunk"]] = relationship(back_populates="document", cascade="all, delete-orphan", lazy="selectin")
     
     def __repr__(self):
-        return f"<Document(id={self.id}, filename='{self.filename}', status={self.vectorization_status})>"
+        return f"<{type(self).__name__} id={self.id}>"
 
 # Track individual text chunks
 class DocumentChunk(Base):
     __tablename__ = "document_chunks"
+    # Clustered on (document_id, chunk_index): a document's chunks sit together
+    # on disk, with no separate rowid B-tree to go through
+    __table_args__ = (
+        PrimaryKeyConstraint("document_id", "chunk_index"),
+        {"sqlite_with_rowid": False},
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
-    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False)
-    chunk_index = Column(Integer, nullable=False)
-    text_content = Column(Text, nullable=False)
-    vector_id = Column(String, nullable=True)  # ID in Qdrant
-    start_page = Column(Integer, nullable=True)
-    end_page = Column(Integer, nullable=True)
-    character_count = Column(Integer, nullable=True)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    document_id: Mapped[int] = mapped_column(ForeignKey("documents.id"))
+    chunk_index: Mapped[int]
+    text_content: Mapped[str] = mapped_column(Text, deferred=True)  # Load with undefer() when needed
+    vector_id: Mapped[Optional[str]]  # ID in Qdrant
+    start_page: Mapped[Optional[int]]
+    end_page: Mapped[Optional[int]]
+    character_count: Mapped[Optional[int]]
+    created_at: Mapped[Optional[datetime.datetime]] = mapped_column(EpochDateTime, default=_utc_now)
     
     # Relationships
-    document = relationship("Document", back_populates="chunks")
+    document: Mapped["Document"] = relationship(back_populates="chunks")
+    
+    @classmethod
+    def bulk_create(cls, session, rows: List[Dict[str, Any]]) -> int:
+        """Insert many chunk rows; the caller owns the transaction (see batch_session)"""
+        if not rows:
+            return 0
+        # executemany on the shared Core INSERT skips the unit of work
+        session.execute(INSERT_CHUNK, rows)
+        return len(rows)
     
     def __repr__(self):
-        return f"<DocumentChunk(id={self.id}, document_id={self.document_id}, chunk_index={self.chunk_index})>"
+        return f"<{type(self).__name__} document_id={self.document_id} chunk_index={self.chunk_index}>"
 
 # Track search queries for analytics
 class SearchQuery(Base):
     __tablename__ = "search_queries"
+    __table_args__ = (
+        Index("ix_sq_user_ts", "user_id", "search_timestamp"),
+    )
     
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)  # Optional for anonymous searches
-    query_text = Column(Text, nullable=False)
-    results_count = Column(Integer, default=0)
-    search_timestamp = Column(DateTime(timezone=True), server_default=func.now())
-    response_time_ms = Column(Integer, nullable=True)
-    min_score = Column(Float, nullable=True)
-    max_score = Column(Float, nullable=True)
-    filters_applied = Column(Text, nullable=True)  # JSON string
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    user_id: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id"))  # Optional for anonymous searches
+    query_text: Mapped[str] = mapped_column(Text)
+    results_count: Mapped[Optional[int]] = mapped_column(default=0)
+    search_timestamp: Mapped[Optional[datetime.datetime]] = mapped_column(EpochDateTime, default=_utc_now)
+    response_time_ms: Mapped[Optional[int]]
+    min_score: Mapped[Optional[float]]
+    max_score: Mapped[Optional[float]]
+    filters_applied: Mapped[Optional[str]] = mapped_column(Text, deferred=True)  # JSON string
     
     # Relationships
-    user = relationship("User", back_populates="search_queries")
+    user: Mapped[Optional["User"]] = relationship(back_populates="search_queries")
     
     def __repr__(self):
-        return f"<SearchQuery(id={self.id}, query_text='{self.query_text[:50]}...', results_count={self.results_count})>"
+        return f"<{type(self).__name__} id={self.id}>"
 
 # Manage vector collections
 class VectorCollectionStatus(str, Enum):
@@ -100,41 +157,76 @@ class VectorCollectionStatus(str, Enum):
 class VectorCollection(Base):
     __tablename__ = "vector_collections"
     
-    id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, unique=True, nullable=False)
-    description = Column(Text, nullable=True)
-    embedding_model = Column(String, nullable=False)
-    vector_dimension = Column(Integer, nullable=False)
-    distance_metric = Column(String, default="cosine")
-    status = Column(SQLEnum(VectorCollectionStatus), default=VectorCollectionStatus.ACTIVE)
-    document_count = Column(Integer, default=0)
-    chunk_count = Column(Integer, default=0)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
-    created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
+    id: Mapped[int] = mapped_column(primary_key=True, index=True)
+    name: Mapped[str] = mapped_column(unique=True)
+    description: Mapped[Optional[str]] = mapped_column(Text)
+    embedding_model: Mapped[str]
+    vector_dimension: Mapped[int]
+    distance_metric: Mapped[Optional[str]] = mapped_column(default="cosine")
+    status: Mapped[str] = mapped_column(String(16), default=VectorCollectionStatus.ACTIVE.value)
+    document_count: Mapped[Optional[int]] = mapped_column(default=0)
+    chunk_count: Mapped[Optional[int]] = mapped_column(default=0)
+    created_at: Mapped[Optional[datetime.datetime]] = mapped_column(EpochDateTime, default=_utc_now)
+    updated_at: Mapped[Optional[datetime.datetime]] = mapped_column(EpochDateTime, onupdate=_utc_now)
+    created_by: Mapped[Optional[int]] = mapped_column(ForeignKey("users.id"))
     
     # Relationships
-    creator = relationship("User")
+    creator: Mapped[Optional["User"]] = relationship()
+    
+    @validates("status")
+    def _validate_status(self, key, value):
+        return VectorCollectionStatus(value).value
     
     def __repr__(self):
         return f"<VectorCollection(id={self.id}, name='{self.name}', status={self.status})>"
 
+# Built once so SQLAlchemy's compiled-statement cache serves every chunk batch
+INSERT_CHUNK = DocumentChunk.__table__.insert()
+
+# Read-through cache of the document columns needed to hydrate search results
+class DocumentRow(NamedTuple):
+    id: int
+    filename: str
+    original_filename: Optional[str]
+    file_path: Optional[str]
+    content_type: Optional[str]
+    created_at: Optional[datetime.datetime]
+    chunks_count: Optional[int]
+
+DOCUMENT_ROW_CACHE_SIZE = 512
+_document_row_cache: "OrderedDict[int, DocumentRow]" = OrderedDict()
+_document_row_lock = threading.Lock()
+
+def fetch_document_rows(document_ids: Iterable[int]) -> Dict[int, DocumentRow]:
+    """Look up documents by id: cache hits first, then one IN query for the misses"""
+    rows: Dict[int, DocumentRow] = {}
+    missing = []
+    with _document_row_lock:
+        for document_id in set(document_ids):
+            row = _document_row_cache.get(document_id)
+            if row is None:
+                missing.append(document_id)
+            else:
+                _document_row_cache.move_to_end(document_id)
+                rows[document_id] = row
+    
+    if missing:
+        stmt = select(*(getattr(Document, field) for field in DocumentRow._fields)).where(Document.id.in_(missing))
+        with engine.connect() as conn:
+            fetched = [DocumentRow(*row) for row in conn.execute(stmt)]
+        
+        with _document_row_lock:
+            for row in fetched:
+                _document_row_cache[row.id] = row
+                rows[row.id] = row
+            while len(_document_row_cache) > DOCUMENT_ROW_CACHE_SIZE:
+                _document_row_cache.popitem(last=False)
+    
+    return rows
 
+def _invalidate_document_row(mapper, connection, target):
+    with _document_row_lock:
+        _document_row_cache.pop(target.id, None)
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+for _event_name in ("after_insert", "after_update", "after_delete"):
+    event.listen(Document, _event_name, _invalidate_document_row)
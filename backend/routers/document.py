@@ -1,24 +1,31 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, status, Body, Depends
+from fastapi import APIRouter, HTTPException, UploadFile, File, status, Body, Depends, BackgroundTasks, Request, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
+from sqlalchemy import select, func
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Union
+import asyncio
 import os
-import uuid
 from datetime import datetime
 import shutil
 import traceback
 from pydantic import BaseModel, HttpUrl
 import logging
-import requests
-from bs4 import BeautifulSoup
-import tempfile
-from playwright.async_api import async_playwright
+import re
+import aiofiles
 import urllib.parse
+from concurrent.futures import Executor
+from ulid import ULID
+from langchain_text_splitters import RecursiveCharacterTextSplitter
 
-from database import get_db
-from models import Document
-from utils.pdf_processor import pdf_processor
+from database import batch_session, get_db, session_factory
+from models import Document, DocumentChunk, fetch_document_rows
+from utils.pdf_processor import (
+    PAGES_PER_TASK, PARALLEL_PAGE_THRESHOLD, pdf_processor,
+    chunk_pdf_pages, count_pdf_pages, extract_pdf_pages, process_pdf_file,
+)
 from utils.qdrant_client import qdrant_client
+from utils.hybrid_search import hybrid_search_engine
 from utils.linkedin_extractor import LinkedInExtractor
 from utils.web_extractor import WebExtractor
 
@@ -42,6 +49,9 @@ class DocumentResponse(BaseModel):
 class UrlToPdfRequest(BaseModel):
     url: HttpUrl
     cookies: Optional[str] = None  # Optional cookies string for authentication
+    # Skip images, media, fonts and stylesheets when rendering in the browser;
+    # faster, but the stored PDF comes out unstyled and without images
+    block_assets: bool = False
 
 router = APIRouter(
     prefix="/upload",
@@ -53,27 +63,209 @@ router = APIRouter(
 UPLOAD_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)), "..", "uploads", "pdfs")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-def initialize_qdrant():
-    """Initialize Qdrant connection and collection"""
+# Read uploads in 1 MiB pieces when streaming them to disk
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+# Anything that isn't a word character, dot or dash is dropped from stored filenames
+_SANITIZE_RE = re.compile(r"[^\w.-]+")
+
+# Splits text extracted from web pages into chunks for vectorization
+_SPLITTER = RecursiveCharacterTextSplitter(
+    chunk_size=1000,
+    chunk_overlap=200,
+    length_function=len,
+    is_separator_regex=False,
+)
+
+def require_qdrant_ready():
+    """Dependency that rejects requests while the vector store isn't initialized"""
+    if not qdrant_client.is_ready():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Vector search service unavailable"
+        )
+
+async def _parse_pdf(file_path: str, executor: Executor) -> List[str]:
+    """
+    Extract and chunk a stored PDF on executor. Long PDFs are split into page
+    ranges that the pool's workers extract in parallel; short ones, any
+    PDFium can't open, and any a page range fails on are parsed in a single task.
+    """
+    loop = asyncio.get_running_loop()
+    page_count = await loop.run_in_executor(executor, count_pdf_pages, file_path)
+    if page_count < PARALLEL_PAGE_THRESHOLD:
+        return await loop.run_in_executor(executor, process_pdf_file, file_path)
+    
     try:
-        if not qdrant_client.connect():
-            return False
-        if not qdrant_client.initialize_collection():
-            return False
-        if not qdrant_client.load_embedding_model():
-            return False
-        return True
+        page_ranges = await asyncio.gather(*(
+            loop.run_in_executor(executor, extract_pdf_pages, file_path, start, start + PAGES_PER_TASK)
+            for start in range(0, page_count, PAGES_PER_TASK)
+        ))
     except Exception as e:
-        logger.error(f"Failed to initialize Qdrant: {str(e)}")
-        return False
+        # PDFium opened the file but failed on a page; the single-task parse
+        # falls back to PyPDF2 like uploads below the threshold do
+        logger.warning(f"Parallel PDFium extraction failed, parsing in one task: {str(e)}")
+        return await loop.run_in_executor(executor, process_pdf_file, file_path)
+    page_texts = [text for page_range in page_ranges for text in page_range]
+    return await loop.run_in_executor(executor, chunk_pdf_pages, page_texts)
 
-@router.post("/upload-pdf", status_code=status.HTTP_201_CREATED, response_model=DocumentResponse)
+async def _vectorize_document(document_id: int, file_path: str, executor: Optional[Executor] = None):
+    """
+    Extract, chunk and embed a stored PDF, then record the outcome on its document row.
+    Runs as a background task, so it uses its own session rather than the request's.
+    PDF parsing runs on executor (the app's process pool) when one is given.
+    """
+    # Read what the Qdrant payload needs, then let the session go so no
+    # transaction stays open while the PDF is parsed and embedded
+    with session_factory() as db:
+        db_document = db.get(Document, document_id)
+        if db_document is None:
+            logger.error(f"Document {document_id} no longer exists, skipping vectorization")
+            return
+        filename = db_document.original_filename
+        created_at = db_document.created_at
+    
+    try:
+        if not qdrant_client.is_ready():
+            raise Exception("Vector search service unavailable")
+        
+        # Process PDF to extract text and create chunks
+        logger.info(f"Starting PDF text extraction and chunking for document {document_id}")
+        if executor is not None:
+            chunks = await _parse_pdf(file_path, executor)
+        else:
+            chunks = await run_in_threadpool(pdf_processor.process_pdf_to_chunks, file_path)
+        
+        # Prepare documents for Qdrant insertion
+        documents_for_qdrant = []
+        for i, chunk in enumerate(chunks):
+            documents_for_qdrant.append({
+                "text": chunk,
+                "document_id": document_id,
+                "user_id": None,  # No user authentication
+                "filename": filename,
+                "chunk_index": i,
+                "created_at": str(created_at)
+            })
+        
+        # Insert into Qdrant
+        logger.info(f"Inserting {len(chunks)} chunks into Qdrant")
+        if not await qdrant_client.insert_documents(documents_for_qdrant):
+            raise Exception("Failed to insert documents into Qdrant")
+        
+        # Record the chunks and the completed status in one transaction
+        with batch_session() as db:
+            DocumentChunk.bulk_create(db, [
+                {
+                    "document_id": document_id,
+                    "chunk_index": i,
+                    "text_content": chunk,
+                    "character_count": len(chunk)
+                }
+                for i, chunk in enumerate(chunks)
+            ])
+            db_document = db.get(Document, document_id)
+            if db_document is None:
+                raise Exception("Document was deleted during vectorization")
+            db_document.vectorization_status = "completed"
+            db_document.chunks_count = len(chunks)
+        hybrid_search_engine.invalidate()
+        logger.info(f"Vectorization of document {document_id} completed successfully")
+        
+    except Exception as vectorization_error:
+        logger.error(f"Vectorization failed: {str(vectorization_error)}")
+        logger.error(traceback.format_exc())
+        
+        # Keep the PDF and record why it isn't searchable
+        with batch_session() as db:
+            db_document = db.get(Document, document_id)
+            if db_document is not None:
+                db_document.vectorization_status = "failed"
+                db_document.vectorization_error = str(vectorization_error)
+
+async def _persist_pdf(
+    source: Union[UploadFile, bytes, str],
+    original_filename: str,
+    db: Session,
+    content_type: Optional[str] = "application/pdf",
+    vectorization_status: str = "pending",
+    vectorization_error: Optional[str] = None,
+) -> Document:
+    """
+    Store a PDF under a unique name in UPLOAD_DIR and add its document row.
+    source may be an upload to stream, the PDF bytes, or a path to copy from.
+    The row is flushed, not committed, so the caller decides when to commit.
+    The file is removed again if the row can't be saved.
+    """
+    # Unique, time-sortable filename: ulid_originalname.pdf
+    clean_filename = _SANITIZE_RE.sub("", original_filename)
+    new_filename = f"{ULID()}_{clean_filename}"
+    file_path = os.path.join(UPLOAD_DIR, new_filename)
+    
+    # Stream to disk without holding the whole file in memory
+    file_size = 0
+    async with aiofiles.open(file_path, "wb") as buffer:
+        if isinstance(source, bytes):
+            await buffer.write(source)
+            file_size = len(source)
+        elif isinstance(source, str):
+            async with aiofiles.open(source, "rb") as src:
+                while chunk := await src.read(UPLOAD_CHUNK_SIZE):
+                    await buffer.write(chunk)
+                    file_size += len(chunk)
+        else:
+            while chunk := await source.read(UPLOAD_CHUNK_SIZE):
+                await buffer.write(chunk)
+                file_size += len(chunk)
+    
+    try:
+        db_document = Document(
+            filename=new_filename,
+            original_filename=original_filename,
+            file_path=file_path,
+            file_size=file_size,
+            content_type=content_type,
+            user_id=None,  # No user authentication
+            vectorization_status=vectorization_status,
+            vectorization_error=vectorization_error,
+            chunks_count=0
+        )
+        db.add(db_document)
+        db.flush()
+        logger.info(f"Document saved with ID: {db_document.id}")
+        return db_document
+    except Exception:
+        db.rollback()
+        try:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+        except Exception as cleanup_error:
+            logger.error(f"File cleanup failed: {str(cleanup_error)}")
+        raise
+
+def _document_response(db_document: Document) -> dict:
+    """Shape a document row as a DocumentResponse payload"""
+    return {
+        "id": db_document.id,
+        "filename": db_document.filename,
+        "original_filename": db_document.original_filename,
+        "file_size": db_document.file_size,
+        "content_type": db_document.content_type or "application/pdf",
+        "created_at": db_document.created_at,
+        "vectorization_status": db_document.vectorization_status,
+        "chunks_count": db_document.chunks_count or 0
+    }
+
+@router.post("/upload-pdf", status_code=status.HTTP_201_CREATED, response_model=DocumentResponse, dependencies=[Depends(require_qdrant_ready)])
 async def upload_pdf(
+    background_tasks: BackgroundTasks,
+    request: Request,
     file: UploadFile = File(...),
     db: Session = Depends(get_db)
 ):
     """
-    Upload a PDF document, extract text, create embeddings, and store in vector DB
+    Upload a PDF document and queue text extraction, embedding and vector storage.
+    The document is returned with status "pending" until vectorization finishes.
     No authentication required
     """
     # Check if file is a PDF
@@ -84,133 +276,19 @@ async def upload_pdf(
         )
     
     try:
-        # Read file content
-        file_content = await file.read()
-        
-        # Generate a unique filename to avoid collisions
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        unique_id = uuid.uuid4().hex
-        original_filename = file.filename
+        db_document = await _persist_pdf(file, file.filename, db, content_type=file.content_type)
         
-        # Sanitize the original filename by removing special characters
-        clean_filename = ''.join(c for c in original_filename if c.isalnum() or c in ['.', '_', '-'])
-        
-        # Create the new filename format: timestamp_uuid_originalname.pdf
-        new_filename = f"{timestamp}_{unique_id}_{clean_filename}"
-        file_path = os.path.join(UPLOAD_DIR, new_filename)
-        
-        # Save the file
-        with open(file_path, "wb") as buffer:
-            buffer.write(file_content)
+        # Read everything the response needs before commit expires the instance
+        response = _document_response(db_document)
+        file_path = db_document.file_path
+        db.commit()
         
-        # Get file size
-        file_size = len(file_content)
+        # Vectorize after the response has been sent
+        background_tasks.add_task(
+            _vectorize_document, response["id"], file_path, request.app.state.process_pool
+        )
         
-        # Create document record in the database (initially with pending status)
-        # No user_id needed since no authentication
-        try:
-            db_document = Document(
-                filename=new_filename,
-                original_filename=original_filename,
-                file_path=file_path,
-                file_size=file_size,
-                content_type=file.content_type,
-                user_id=None,  # No user authentication
-                vectorization_status="pending"
-            )
-            
-            logger.info(f"Created document object: {db_document.filename}")
-            
-            db.add(db_document)
-            db.commit()
-            db.refresh(db_document)
-            logger.info(f"Document saved with ID: {db_document.id}")
-            
-            # Now process the PDF for vectorization
-            try:
-                # Initialize Qdrant if not already done
-                if not initialize_qdrant():
-                    raise Exception("Failed to initialize Qdrant")
-                
-                # Process PDF to extract text and create chunks
-                logger.info("Starting PDF text extraction and chunking")
-                chunks = pdf_processor.process_pdf_to_chunks(file_content)
-                
-                # Prepare documents for Qdrant insertion
-                documents_for_qdrant = []
-                for i, chunk in enumerate(chunks):
-                    documents_for_qdrant.append({
-                        "text": chunk,
-                        "document_id": db_document.id,
-                        "user_id": None,  # No user authentication
-                        "filename": original_filename,
-                        "chunk_index": i,
-                        "created_at": str(db_document.created_at)
-                    })
-                
-                # Insert into Qdrant
-                logger.info(f"Inserting {len(chunks)} chunks into Qdrant")
-                if qdrant_client.insert_documents(documents_for_qdrant):
-                    # Update document status to completed
-                    db_document.vectorization_status = "completed"
-                    db_document.chunks_count = len(chunks)
-                    logger.info("Vectorization completed successfully")
-                else:
-                    raise Exception("Failed to insert documents into Qdrant")
-                
-            except Exception as vectorization_error:
-                # Update document status to failed
-                db_document.vectorization_status = "failed"
-                db_document.vectorization_error = str(vectorization_error)
-                logger.error(f"Vectorization failed: {str(vectorization_error)}")
-                logger.error(traceback.format_exc())
-                
-                # Since the requirement is to fail the entire upload if vectorization fails
-                # We'll delete the uploaded file and database record
-                try:
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
-                    db.delete(db_document)
-                    db.commit()
-                except Exception as cleanup_error:
-                    logger.error(f"Cleanup failed: {str(cleanup_error)}")
-                
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=f"PDF processing failed: {str(vectorization_error)}"
-                )
-            
-            # Final commit for successful vectorization
-            db.commit()
-            db.refresh(db_document)
-            
-            # Return the document response (without user information)
-            return {
-                "id": db_document.id,
-                "filename": db_document.filename,
-                "original_filename": db_document.original_filename,
-                "file_size": db_document.file_size,
-                "content_type": db_document.content_type or "application/pdf",
-                "created_at": db_document.created_at,
-                "vectorization_status": db_document.vectorization_status,
-                "chunks_count": db_document.chunks_count or 0
-            }
-            
-        except Exception as db_error:
-            logger.error(f"Database error: {str(db_error)}")
-            logger.error(traceback.format_exc())
-            
-            # Clean up the uploaded file on database error
-            try:
-                if os.path.exists(file_path):
-                    os.remove(file_path)
-            except Exception as cleanup_error:
-                logger.error(f"File cleanup failed: {str(cleanup_error)}")
-                
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Database error: {str(db_error)}"
-            )
+        return response
         
     except Exception as e:
         logger.error(f"Upload failed: {str(e)}")
@@ -221,28 +299,35 @@ async def upload_pdf(
         )
 
 @router.get("/pdf-list", response_model=List[DocumentResponse])
-async def list_pdfs(db: Session = Depends(get_db)):
+async def list_pdfs(
+    offset: int = Query(0, ge=0),
+    limit: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db)
+):
     """
-    Get a list of all uploaded PDF documents
+    Get a list of uploaded PDF documents, newest first
+    Pass offset/limit to page through the list
     No authentication required
     """
     try:
-        documents = db.query(Document).all()
-        
-        document_responses = []
-        for doc in documents:
-            document_responses.append({
-                "id": doc.id,
-                "filename": doc.filename,
-                "original_filename": doc.original_filename,
-                "file_size": doc.file_size,
-                "content_type": doc.content_type or "application/pdf",
-                "created_at": doc.created_at,
-                "vectorization_status": doc.vectorization_status or "unknown",
-                "chunks_count": doc.chunks_count or 0
-            })
+        # Only the columns the response needs; file_path and error text stay on disk
+        stmt = (
+            select(
+                Document.id,
+                Document.filename,
+                Document.original_filename,
+                Document.file_size,
+                func.coalesce(Document.content_type, "application/pdf").label("content_type"),
+                Document.created_at,
+                func.coalesce(Document.vectorization_status, "unknown").label("vectorization_status"),
+                func.coalesce(Document.chunks_count, 0).label("chunks_count"),
+            )
+            .order_by(Document.created_at.desc())
+            .offset(offset)
+            .limit(limit)
+        )
         
-        return document_responses
+        return db.execute(stmt).mappings().all()
         
     except Exception as e:
         logger.error(f"Error fetching documents: {str(e)}")
@@ -251,7 +336,7 @@ async def list_pdfs(db: Session = Depends(get_db)):
             detail=f"Error fetching documents: {str(e)}"
         )
 
-@router.get("/search")
+@router.get("/search", dependencies=[Depends(require_qdrant_ready)])
 async def search_documents(
     query: str,
     limit: int = 5,
@@ -263,13 +348,6 @@ async def search_documents(
     No authentication required
     """
     try:
-        # Initialize Qdrant if not already done
-        if not initialize_qdrant():
-            raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail="Vector search service unavailable"
-            )
-        
         # Perform the search using the correct method
         search_results = qdrant_client.search(
             query_text=query,
@@ -284,6 +362,11 @@ async def search_documents(
                 "message": "No results found"
             }
         
+        # Load every referenced document with a single query
+        doc_ids = {result.get('metadata', {}).get('document_id') for result in search_results}
+        doc_ids.discard(None)
+        documents = fetch_document_rows(doc_ids)
+        
         # Format results
         formatted_results = []
         for result in search_results:
@@ -295,7 +378,7 @@ async def search_documents(
                 # Get document info from database
                 doc_id = result.get('metadata', {}).get('document_id')
                 if doc_id:
-                    document = db.query(Document).filter(Document.id == doc_id).first()
+                    document = documents.get(doc_id)
                     if document:
                         formatted_results.append({
                             "document_id": doc_id,
@@ -329,196 +412,147 @@ async def search_documents(
             detail=f"Search failed: {str(e)}"
         )
 
-@router.post("/url-to-pdf", status_code=status.HTTP_201_CREATED, response_model=DocumentResponse)
+@router.post("/url-to-pdf", status_code=status.HTTP_201_CREATED, response_model=DocumentResponse, dependencies=[Depends(require_qdrant_ready)])
 async def url_to_pdf(
     url_request: UrlToPdfRequest,
+    request: Request,
     db: Session = Depends(get_db)
 ):
     """
     Fetch a URL, extract main content, convert to PDF, and upload as document
     """
     try:
+        url = str(url_request.url)
+        
         # Generate a filename from the URL
-        parsed_url = urllib.parse.urlparse(str(url_request.url))
+        parsed_url = urllib.parse.urlparse(url)
         base_name = parsed_url.netloc.replace('.', '_')
         path_part = parsed_url.path.strip('/').split('/')[-1] or 'webpage'
         if not path_part.lower().endswith('.pdf'):
             path_part += '.pdf'
         generated_filename = f"{base_name}_{path_part}"
 
+        # Static pages only need an HTTP GET and an HTML renderer
+        pdf_content = None
+        if not WebExtractor.requires_browser(url):
+            success, extracted_text, pdf_content = await WebExtractor.process_static_url(
+                url, request.app.state.http_client
+            )
+        
         # Use Playwright to navigate to URL and render the full page
-        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp_pdf:
-            async with async_playwright() as p:
-                browser = await p.chromium.launch()
-                page = await browser.new_page()
-                
-                # Use appropriate extractor based on URL type
-                if LinkedInExtractor.is_linkedin_url(str(url_request.url)):
-                    success, extracted_text = await LinkedInExtractor.process_linkedin_url(
-                        page, str(url_request.url), url_request.cookies
-                    )
-                else:
-                    success, extracted_text = await WebExtractor.process_web_url(page, str(url_request.url))
-                
-                if not success:
-                    logger.warning(f"Failed to extract content from {str(url_request.url)}")
-                    extracted_text = ""
-                
-                # Generate PDF of the fully rendered page
-                await page.pdf(path=tmp_pdf.name, format='A4', print_background=True)
-                await browser.close()
+        if pdf_content is None:
+            browser = request.app.state.browser
+            if browser is None:
+                raise Exception("Browser rendering is unavailable")
             
-            tmp_pdf.seek(0)
-            
-            # If we have extracted text and it's substantial, use it for vectorization
-            if extracted_text and len(extracted_text) > 100:
-                # Create document record directly with extracted text
+            # Bound concurrent pages so a burst of requests can't exhaust memory
+            async with request.app.state.browser_semaphore:
+                context = await browser.new_context()
                 try:
-                    # Read PDF content for file storage
-                    with open(tmp_pdf.name, "rb") as pdf_file:
-                        pdf_content = pdf_file.read()
+                    page = await context.new_page()
                     
-                    # Generate unique filename
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    unique_id = uuid.uuid4().hex
-                    clean_filename = ''.join(c for c in generated_filename if c.isalnum() or c in ['.', '_', '-'])
-                    new_filename = f"{timestamp}_{unique_id}_{clean_filename}"
-                    file_path = os.path.join(UPLOAD_DIR, new_filename)
+                    # Use appropriate extractor based on URL type
+                    if LinkedInExtractor.is_linkedin_url(url):
+                        success, extracted_text = await LinkedInExtractor.process_linkedin_url(
+                            page, url, url_request.cookies, url_request.block_assets
+                        )
+                    else:
+                        success, extracted_text = await WebExtractor.process_web_url(
+                            page, url, url_request.block_assets
+                        )
                     
-                    # Save PDF file
-                    with open(file_path, "wb") as buffer:
-                        buffer.write(pdf_content)
+                    if not success:
+                        logger.warning(f"Failed to extract content from {url}")
+                        extracted_text = ""
                     
-                    # Create document record
-                    db_document = Document(
-                        filename=new_filename,
-                        original_filename=generated_filename,
-                        file_path=file_path,
-                        file_size=len(pdf_content),
-                        content_type="application/pdf",
-                        user_id=None,  # No user authentication
-                        vectorization_status="pending"
-                    )
+                    # Generate PDF of the fully rendered page, kept in memory
+                    pdf_content = await page.pdf(format='A4', print_background=True)
+                finally:
+                    await context.close()
+        
+        # If we have extracted text and it's substantial, use it for vectorization
+        if extracted_text and len(extracted_text) > 100:
+            # Create document record directly with extracted text
+            try:
+                db_document = await _persist_pdf(pdf_content, generated_filename, db)
+                result = _document_response(db_document)
+                document_id = result["id"]
+                # Commit before embedding so the SQLite write lock isn't held meanwhile
+                db.commit()
+                
+                # Process extracted text for vectorization
+                try:
+                    # Create chunks from extracted text
+                    chunks = _SPLITTER.split_text(extracted_text)
                     
-                    db.add(db_document)
-                    db.commit()
-                    db.refresh(db_document)
+                    # Prepare documents for Qdrant insertion
+                    documents_for_qdrant = []
+                    for i, chunk in enumerate(chunks):
+                        documents_for_qdrant.append({
+                            "text": chunk,
+                            "document_id": document_id,
+                            "user_id": None,  # No user authentication
+                            "filename": generated_filename,
+                            "chunk_index": i,
+                            "created_at": str(result["created_at"])
+                        })
                     
-                    # Process extracted text for vectorization
-                    try:
-                        # Initialize Qdrant if not already done
-                        if not initialize_qdrant():
-                            raise Exception("Failed to initialize Qdrant")
-                        
-                        # Create chunks from extracted text
-                        from langchain_text_splitters import RecursiveCharacterTextSplitter
-                        text_splitter = RecursiveCharacterTextSplitter(
-                            chunk_size=1000,
-                            chunk_overlap=200,
-                            length_function=len,
-                        )
-                        chunks = text_splitter.split_text(extracted_text)
-                        
-                        # Prepare documents for Qdrant insertion
-                        documents_for_qdrant = []
-                        for i, chunk in enumerate(chunks):
-                            documents_for_qdrant.append({
-                                "text": chunk,
-                                "document_id": db_document.id,
-                                "user_id": None,  # No user authentication
-                                "filename": generated_filename,
+                    # Insert into Qdrant
+                    if await qdrant_client.insert_documents(documents_for_qdrant):
+                        db_document.vectorization_status = "completed"
+                        db_document.chunks_count = len(chunks)
+                        DocumentChunk.bulk_create(db, [
+                            {
+                                "document_id": document_id,
                                 "chunk_index": i,
-                                "created_at": str(db_document.created_at)
-                            })
-                        
-                        # Insert into Qdrant
-                        if qdrant_client.insert_documents(documents_for_qdrant):
-                            db_document.vectorization_status = "completed"
-                            db_document.chunks_count = len(chunks)
-                        else:
-                            raise Exception("Failed to insert documents into Qdrant")
-                        
-                    except Exception as vectorization_error:
-                        db_document.vectorization_status = "failed"
-                        db_document.vectorization_error = str(vectorization_error)
-                        logger.error(f"Vectorization failed: {str(vectorization_error)}")
-                    
-                    # Final commit
-                    db.commit()
-                    db.refresh(db_document)
-                    
-                    # Return response
-                    result = {
-                        "id": db_document.id,
-                        "filename": db_document.filename,
-                        "original_filename": db_document.original_filename,
-                        "file_size": db_document.file_size,
-                        "content_type": db_document.content_type or "application/pdf",
-                        "created_at": db_document.created_at,
-                        "vectorization_status": db_document.vectorization_status,
-                        "chunks_count": db_document.chunks_count
-                    }
-                    
-                except Exception as e:
-                    logger.error(f"Error processing extracted text: {str(e)}")
-                    # Fallback to creating document without vectorization
-                    return await create_pdf_document_without_vectorization(tmp_pdf.name, generated_filename, db, "Content extraction succeeded but vectorization failed")
-            else:
-                # No substantial text extracted - create document but mark vectorization as failed
-                return await create_pdf_document_without_vectorization(tmp_pdf.name, generated_filename, db, "No substantial text content could be extracted from the webpage")
+                                "text_content": chunk,
+                                "character_count": len(chunk)
+                            }
+                            for i, chunk in enumerate(chunks)
+                        ])
+                        result["vectorization_status"] = "completed"
+                        result["chunks_count"] = len(chunks)
+                    else:
+                        raise Exception("Failed to insert documents into Qdrant")
+                
+                except Exception as vectorization_error:
+                    db.rollback()
+                    db_document.vectorization_status = "failed"
+                    db_document.vectorization_error = str(vectorization_error)
+                    result["vectorization_status"] = "failed"
+                    logger.error(f"Vectorization failed: {str(vectorization_error)}")
+                
+                # Status and chunks land in one commit; the response already
+                # holds the final values, so the row isn't re-read
+                db.commit()
+                if result["vectorization_status"] == "completed":
+                    hybrid_search_engine.invalidate()
+            
+            except Exception as e:
+                logger.error(f"Error processing extracted text: {str(e)}")
+                # Fallback to creating document without vectorization
+                return await create_pdf_document_without_vectorization(pdf_content, generated_filename, db, "Content extraction succeeded but vectorization failed")
+        else:
+            # No substantial text extracted - create document but mark vectorization as failed
+            return await create_pdf_document_without_vectorization(pdf_content, generated_filename, db, "No substantial text content could be extracted from the webpage")
 
-        os.remove(tmp_pdf.name)
         return result
     except Exception as e:
         logger.error(f"URL to PDF error: {str(e)}")
         logger.error(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"Failed to process URL: {str(e)}")
 
-async def create_pdf_document_without_vectorization(pdf_path: str, original_filename: str, db: Session, error_reason: str):
+async def create_pdf_document_without_vectorization(pdf_content: bytes, original_filename: str, db: Session, error_reason: str):
     """Helper function to create a document record when vectorization fails"""
     try:
-        # Read PDF content
-        with open(pdf_path, "rb") as pdf_file:
-            pdf_content = pdf_file.read()
-        
-        # Generate unique filename
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        unique_id = uuid.uuid4().hex
-        clean_filename = ''.join(c for c in original_filename if c.isalnum() or c in ['.', '_', '-'])
-        new_filename = f"{timestamp}_{unique_id}_{clean_filename}"
-        file_path = os.path.join(UPLOAD_DIR, new_filename)
-        
-        # Save PDF file
-        with open(file_path, "wb") as buffer:
-            buffer.write(pdf_content)
-        
-        # Create document record with failed vectorization status
-        db_document = Document(
-            filename=new_filename,
-            original_filename=original_filename,
-            file_path=file_path,
-            file_size=len(pdf_content),
-            content_type="application/pdf",
-            user_id=None,
+        db_document = await _persist_pdf(
+            pdf_content, original_filename, db,
             vectorization_status="failed",
-            vectorization_error=error_reason,
-            chunks_count=0
+            vectorization_error=error_reason
         )
-        
-        db.add(db_document)
+        response = _document_response(db_document)
         db.commit()
-        db.refresh(db_document)
-        
-        return {
-            "id": db_document.id,
-            "filename": db_document.filename,
-            "original_filename": db_document.original_filename,
-            "file_size": db_document.file_size,
-            "content_type": db_document.content_type or "application/pdf",
-            "created_at": db_document.created_at,
-            "vectorization_status": db_document.vectorization_status,
-            "chunks_count": db_document.chunks_count
-        }
+        return response
         
     except Exception as e:
         logger.error(f"Failed to create document without vectorization: {str(e)}")
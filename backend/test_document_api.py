@@ -1,12 +1,60 @@
 import requests
+from requests.adapters import HTTPAdapter
+from requests_toolbelt import MultipartEncoder
+import glob
+from bisect import bisect_right
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from getpass import getpass
 
-def login(base_url, username, password):
+try:
+    import orjson
+except ImportError:  # Optional; stdlib json parses the same payloads, just slower
+    import json as orjson
+
+try:
+    import ijson
+except ImportError:  # Optional; large searches are parsed in one shot instead
+    ijson = None
+
+# Searches returning more chunks than this are rendered as the body streams in
+STREAM_SEARCH_LIMIT = 10
+
+# Relevance labels for search scores: below 0.4, 0.4-0.6, 0.6-0.8, 0.8 and up
+_SCORE_EDGES = (0.4, 0.6, 0.8)
+_SCORE_BUCKETS = (
+    ("📉 WEAK MATCH", "🔴"),
+    ("📊 FAIR MATCH", "🟠"),
+    ("📈 GOOD MATCH", "🟡"),
+    ("🎯 EXCELLENT MATCH", "🟢"),
+)
+_RULE = '━' * 70
+_DOUBLE_RULE = '=' * 70
+
+# Keeps output from concurrent uploads from interleaving
+_print_lock = threading.Lock()
+
+def locked_print(*lines):
+    """Print lines as one block while holding the output lock"""
+    with _print_lock:
+        print("\n".join(lines))
+
+def create_session():
+    """Create a pooled session so every call reuses the same keep-alive connection"""
+    session = requests.Session()
+    # The API gzips larger bodies (long chunk texts, big document lists)
+    session.headers["Accept-Encoding"] = "gzip"
+    adapter = HTTPAdapter(pool_connections=20, pool_maxsize=20)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+def login(session, base_url, username, password):
     """Login and get access token"""
     login_url = f"{base_url}/auth/login"
-    response = requests.post(
+    response = session.post(
         login_url,
         data={"username": username, "password": password}
     )
@@ -16,9 +64,9 @@ def login(base_url, username, password):
         print(response.text)
         sys.exit(1)
     
-    return response.json()["access_token"]
+    return orjson.loads(response.content)["access_token"]
 
-def upload_pdf(base_url, token, pdf_path):
+def upload_pdf(session, base_url, pdf_path):
     """Upload a PDF file to the server"""
     upload_url = f"{base_url}/upload/upload-pdf"
     
@@ -32,45 +80,68 @@ def upload_pdf(base_url, token, pdf_path):
         print("Error: File must be a PDF")
         sys.exit(1)
     
-    headers = {
-        "Authorization": f"Bearer {token}"
-    }
-    
     with open(pdf_path, 'rb') as f:
-        files = {"file": (os.path.basename(pdf_path), f, "application/pdf")}
+        # Stream the multipart body from the file instead of building it in memory
+        encoder = MultipartEncoder(
+            fields={"file": (os.path.basename(pdf_path), f, "application/pdf")}
+        )
         
-        print(f"Uploading {pdf_path}...")
-        response = requests.post(upload_url, headers=headers, files=files)
+        locked_print(f"Uploading {pdf_path}...")
+        response = session.post(
+            upload_url,
+            data=encoder,
+            headers={"Content-Type": encoder.content_type}
+        )
     
     if response.status_code == 201:
-        result = response.json()
-        print(f"✅ Upload successful!")
-        print(f"   Document ID: {result['id']}")
-        print(f"   Original filename: {result['original_filename']}")
-        print(f"   Stored filename: {result['filename']}")
-        print(f"   File size: {result['file_size']} bytes")
-        print(f"   Vectorization status: {result['vectorization_status']}")
-        print(f"   Chunks created: {result['chunks_count']}")
-        print(f"   Upload time: {result['created_at']}")
+        result = orjson.loads(response.content)
+        locked_print(
+            f"✅ Upload successful!",
+            f"   Document ID: {result['id']}",
+            f"   Original filename: {result['original_filename']}",
+            f"   Stored filename: {result['filename']}",
+            f"   File size: {result['file_size']} bytes",
+            f"   Vectorization status: {result['vectorization_status']}",
+            f"   Chunks created: {result['chunks_count']}",
+            f"   Upload time: {result['created_at']}",
+        )
         return result
     else:
-        print(f"❌ Upload failed with status code {response.status_code}")
-        print(f"Response: {response.text}")
+        locked_print(
+            f"❌ Upload failed with status code {response.status_code} ({pdf_path})",
+            f"Response: {response.text}",
+        )
         return None
 
-def list_pdfs(base_url, token):
+def upload_many(session, base_url, pattern, workers=8):
+    """Upload every PDF matching a directory or glob pattern, several at a time"""
+    if os.path.isdir(pattern):
+        pattern = os.path.join(pattern, "*.pdf")
+    paths = sorted(p for p in glob.glob(pattern) if p.lower().endswith('.pdf') and os.path.isfile(p))
+    
+    if not paths:
+        print(f"No PDF files match {pattern}")
+        return []
+    
+    print(f"Uploading {len(paths)} PDFs with {workers} workers...")
+    # The session's connection pool (20) is larger than the worker count, so
+    # each worker keeps its own keep-alive connection
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda path: upload_pdf(session, base_url, path), paths))
+    
+    succeeded = sum(1 for result in results if result is not None)
+    print(f"Batch upload finished: {succeeded}/{len(paths)} succeeded")
+    return results
+
+def list_pdfs(session, base_url):
     """List all uploaded PDF files"""
     list_url = f"{base_url}/upload/pdf-list"
     
-    headers = {
-        "Authorization": f"Bearer {token}"
-    }
-    
     print("Fetching list of uploaded PDFs...")
-    response = requests.get(list_url, headers=headers)
+    response = session.get(list_url)
     
     if response.status_code == 200:
-        documents = response.json()
+        documents = orjson.loads(response.content)
         print(f"✅ Found {len(documents)} documents:")
         for doc in documents:
             status_emoji = "✅" if doc['vectorization_status'] == 'completed' else "⏳" if doc['vectorization_status'] == 'pending' else "❌"
@@ -101,75 +172,95 @@ def print_document_info(doc):
         print(f"  Message: {doc['message']}")
     print()
 
-def search_documents(base_url, token, query, limit=5):
+def _format_search_result(i, result):
+    """Render one search hit as a report block"""
+    score = result['score']
+    
+    # Enhanced relevance indicators
+    relevance, score_color = _SCORE_BUCKETS[bisect_right(_SCORE_EDGES, score)]
+    
+    # Collapse newlines and repeated whitespace in the chunk text
+    text = ' '.join(result['text'].split())
+    
+    return (
+        f"{_RULE}\n"
+        f"🏆 RESULT #{i}\n"
+        f"{_RULE}\n"
+        f"{score_color} Similarity Score: {score:.4f} - {relevance}\n"
+        f"📄 Document: {result['document']['original_filename']}\n"
+        f"🔢 Chunk: #{result['chunk_index']} | 📅 Uploaded: {result['document']['created_at'][:10]}\n"
+        "\n"
+        "📖 CONTENT:\n"
+        f"   {text}\n"
+        "\n"
+    )
+
+def _format_search_summary(scores):
+    """Render the best/average score summary for a list of scores"""
+    best_score = max(scores)
+    avg_score = sum(scores) / len(scores)
+    return (
+        f"{_DOUBLE_RULE}\n"
+        "📊 SEARCH SUMMARY:\n"
+        f"   🎯 Best Match Score: {best_score:.4f}\n"
+        f"   📈 Average Score: {avg_score:.4f}\n"
+        f"   🔍 Search Quality: {'Excellent' if best_score >= 0.7 else 'Good' if best_score >= 0.5 else 'Fair' if best_score >= 0.3 else 'Poor'}\n"
+        f"{_DOUBLE_RULE}\n"
+    )
+
+def _stream_search_results(response, query):
+    """Print each search hit as soon as it is parsed from the response body"""
+    # Let urllib3 undo the gzip encoding on the raw stream
+    response.raw.decode_content = True
+    
+    sys.stdout.write(f"📝 Query: '{query}'\n\n")
+    items = []
+    for i, result in enumerate(ijson.items(response.raw, 'results.item', use_float=True), 1):
+        items.append(result)
+        sys.stdout.write(_format_search_result(i, result))
+        sys.stdout.flush()
+    
+    footer = f"✅ Found {len(items)} matching chunks\n"
+    if items:
+        footer = _format_search_summary([result['score'] for result in items]) + footer
+    sys.stdout.write(footer)
+    
+    return {"query": query, "results": items, "results_count": len(items)}
+
+def search_documents(session, base_url, query, limit=5):
     """Search for documents using semantic search"""
     search_url = f"{base_url}/upload/search"
     
-    headers = {
-        "Authorization": f"Bearer {token}"
-    }
-    
     print(f"🔍 Searching for: '{query}'")
     print("-" * 70)
     
-    response = requests.post(
+    # Large result sets are streamed so the first hits show before the whole body arrives
+    stream = ijson is not None and limit > STREAM_SEARCH_LIMIT
+    response = session.post(
         search_url, 
-        headers=headers, 
-        params={"query": query, "limit": limit}
+        params={"query": query, "limit": limit},
+        stream=stream
     )
     
     if response.status_code == 200:
-        results = response.json()
-        print(f"✅ Found {results['results_count']} matching chunks (showing top 3):")
-        print(f"📝 Query: '{results['query']}'")
-        print()
+        if stream:
+            with response:
+                return _stream_search_results(response, query)
         
-        for i, result in enumerate(results['results'], 1):
-            score = result['score']
-            
-            # Enhanced relevance indicators
-            if score >= 0.8:
-                relevance = "🎯 EXCELLENT MATCH"
-                score_color = "🟢"
-            elif score >= 0.6:
-                relevance = "📈 GOOD MATCH"
-                score_color = "🟡"
-            elif score >= 0.4:
-                relevance = "📊 FAIR MATCH"
-                score_color = "🟠"
-            else:
-                relevance = "📉 WEAK MATCH"
-                score_color = "🔴"
-            
-            print(f"{'━' * 70}")
-            print(f"🏆 RESULT #{i}")
-            print(f"{'━' * 70}")
-            print(f"{score_color} Similarity Score: {score:.4f} - {relevance}")
-            print(f"📄 Document: {result['document']['original_filename']}")
-            print(f"🔢 Chunk: #{result['chunk_index']} | 📅 Uploaded: {result['document']['created_at'][:10]}")
-            print()
-            
-            # Enhanced text display with better formatting
-            text = result['text'].strip()
-            
-            # Clean up the text
-            text = text.replace('\n', ' ').replace('\r', ' ')
-            text = ' '.join(text.split())  # Remove extra spaces
-            
-            print(f"📖 CONTENT:")
-            print(f"   {text}")
-            print()
+        results = orjson.loads(response.content)
+        # Build the whole report and write it once instead of printing line by line
+        out = [
+            f"✅ Found {results['results_count']} matching chunks (showing top 3):\n",
+            f"📝 Query: '{results['query']}'\n",
+            "\n",
+        ]
+        out.extend(_format_search_result(i, result) for i, result in enumerate(results['results'], 1))
         
         # Summary statistics
         if results['results']:
-            avg_score = sum(r['score'] for r in results['results']) / len(results['results'])
-            best_score = max(r['score'] for r in results['results'])
-            print(f"{'=' * 70}")
-            print(f"📊 SEARCH SUMMARY:")
-            print(f"   🎯 Best Match Score: {best_score:.4f}")
-            print(f"   📈 Average Score: {avg_score:.4f}")
-            print(f"   🔍 Search Quality: {'Excellent' if best_score >= 0.7 else 'Good' if best_score >= 0.5 else 'Fair' if best_score >= 0.3 else 'Poor'}")
-            print(f"{'=' * 70}")
+            out.append(_format_search_summary([result['score'] for result in results['results']]))
+        
+        sys.stdout.write("".join(out))
         
         return results
     else:
@@ -188,31 +279,37 @@ if __name__ == "__main__":
     
     # Login and get token
     try:
-        token = login(base_url, username, password)
-        print(f"Login successful, token obtained")
-        
-        while True:
-            print("\nOptions:")
-            print("1. Upload a PDF file")
-            print("2. List all PDF files")
-            print("3. Search documents")
-            print("4. Exit")
-            
-            choice = input("Enter your choice (1-4): ")
+        with create_session() as session:
+            token = login(session, base_url, username, password)
+            session.headers.update({"Authorization": f"Bearer {token}"})
+            print(f"Login successful, token obtained")
             
-            if choice == "1":
-                pdf_path = input("Enter the path to the PDF file: ")
-                upload_pdf(base_url, token, pdf_path)
-            elif choice == "2":
-                list_pdfs(base_url, token)
-            elif choice == "3":
-                query = input("Enter your search query: ")
-                search_documents(base_url, token, query, 3)
-            elif choice == "4":
-                print("Exiting...")
-                break
-            else:
-                print("Invalid choice. Please try again.")
+            while True:
+                print("\nOptions:")
+                print("1. Upload a PDF file")
+                print("2. List all PDF files")
+                print("3. Search documents")
+                print("4. Batch upload a directory of PDFs")
+                print("5. Exit")
+                
+                choice = input("Enter your choice (1-5): ")
+                
+                if choice == "1":
+                    pdf_path = input("Enter the path to the PDF file: ")
+                    upload_pdf(session, base_url, pdf_path)
+                elif choice == "2":
+                    list_pdfs(session, base_url)
+                elif choice == "3":
+                    query = input("Enter your search query: ")
+                    search_documents(session, base_url, query, 3)
+                elif choice == "4":
+                    pattern = input("Enter a directory or glob pattern (e.g. docs/*.pdf): ")
+                    upload_many(session, base_url, pattern)
+                elif choice == "5":
+                    print("Exiting...")
+                    break
+                else:
+                    print("Invalid choice. Please try again.")
     except requests.exceptions.ConnectionError:
         print(f"Connection error: Could not connect to {base_url}")
         print("Make sure the server is running")
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Test script to verify hybrid search keyword matching
+"""
+import sys
+sys.path.append('.')
+
+from utils.hybrid_search import HybridSearchEngine, _find_matches, _prepare_query
+
+def test_nested_query_words():
+    print("=== TESTING NESTED QUERY WORDS ===")
+    
+    # "a" is a whole word inside "a.b" too, so both are counted
+    query = "new a a.b"
+    text = "see a.b here"
+    prepared = _prepare_query(query)
+    expected = [(4, prepared.word_ids["a.b"]), (4, prepared.word_ids["a"])]
+    
+    # The regex fallback must find what the Aho-Corasick matcher finds
+    matchers = {"regex": prepared._replace(automaton=None)}
+    if prepared.automaton is not None:
+        matchers["aho-corasick"] = prepared
+    
+    for name, matcher in matchers.items():
+        matches = _find_matches(matcher, text)
+        assert sorted(matches) == sorted(expected), f"{name} matcher found {matches}"
+        print(f"✅ {name} matcher found both words: {matches}")
+    
+    # 2 of 3 query words matched, plus the bonus for words close together
+    score = HybridSearchEngine().calculate_keyword_score(query, text)
+    assert abs(score - (2 + 0.3) / 3) < 1e-9, f"keyword score {score}"
+    print(f"✅ Keyword score: {score:.3f}")
+
+if __name__ == "__main__":
+    test_nested_query_words()
@@ -7,22 +7,15 @@ import os
 sys.path.append('.')
 
 from utils.qdrant_client import qdrant_client
-from database import get_db
-from models import Document
+from models import fetch_document_rows
 
 def test_search():
     print("=== TESTING SEARCH FUNCTIONALITY ===")
     
-    # Initialize Qdrant
+    # Initialize Qdrant; repeat runs in the same process reuse the loaded model
     print("1. Initializing Qdrant...")
-    if not qdrant_client.connect():
-        print("❌ Failed to connect to Qdrant")
-        return
-    if not qdrant_client.initialize_collection():
-        print("❌ Failed to initialize collection")
-        return
-    if not qdrant_client.load_embedding_model():
-        print("❌ Failed to load embedding model")
+    if not qdrant_client.ensure_ready():
+        print("❌ Failed to initialize Qdrant (see log for the failing step)")
         return
     print("✅ Qdrant initialized successfully")
     
@@ -45,24 +38,28 @@ def test_search():
     filtered_results = [result for result in search_results if result['score'] >= default_min_confidence]
     print(f"✅ {len(filtered_results)} results after confidence filtering")
     
-    # Get database session
-    db = next(get_db())
+    # Resolve every hit's document with one IN query (same as API)
+    def parse_document_id(result):
+        document_id = result['metadata']['document_id']
+        if document_id is not None:
+            try:
+                return int(document_id)
+            except Exception:
+                return None
+        return None
+    
+    document_ids = {parse_document_id(result) for result in filtered_results} - {None}
+    documents = fetch_document_rows(document_ids)
     
     # Process results (same as API)
     print("\n4. Processing results...")
     enriched_results = []
     for result in filtered_results:
-        document_id = result['metadata']['document_id']
+        document_id = parse_document_id(result)
         filename = result['metadata'].get('filename', 'Unknown')
         created_at = result['metadata'].get('created_at') if 'created_at' in result['metadata'] else None
         
-        if document_id is not None:
-            try:
-                document_id = int(document_id)
-            except Exception:
-                document_id = None
-        
-        document = db.query(Document).filter(Document.id == document_id).first() if document_id is not None else None
+        document = documents.get(document_id) if document_id is not None else None
 
         enriched_result = {
             "score": result['score'],
@@ -89,8 +86,6 @@ def test_search():
         print(f"Document: {result['document']['original_filename'] if result['document'] else 'Unknown'}")
         print(f"Text: {result['text'][:150]}...")
     
-    db.close()
-    
     # Summary
     print(f"\n=== SUMMARY ===")
     print(f"Query: '{query}'")
@@ -6,5 +6,8 @@ This package contains various utility modules:
 - web_extractor: Generic web content extraction  
 - pdf_processor: PDF processing utilities
 - qdrant_client: Vector database client
+- onnx_embedder: Quantized ONNX Runtime drop-in for the embedding model
+- embedding_cache: Cache of chunk embeddings keyed by text hash
 - hybrid_search: Hybrid search engine combining semantic and keyword matching
+- ttl_cache: Time-based memoization for frequently polled values
 """
@@ -0,0 +1,108 @@
+"""
+Embedding Cache Module
+
+This module caches chunk embeddings keyed by a hash of the normalized chunk
+text, so boilerplate shared across PDFs (cover pages, headers, legal footers)
+is only embedded once. Vectors are kept in Redis when REDIS_URL is set and in
+an in-process LRU otherwise.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Redis entries expire after 30 days
+REDIS_TTL_SECONDS = 30 * 24 * 60 * 60
+
+
+class EmbeddingCache:
+    """
+    Cache of embedding vectors keyed by SHA-256 of the normalized text.
+    
+    Keys include the embedding model name so vectors from different models
+    never mix.
+    """
+    
+    def __init__(self, maxsize: int = 10000):
+        """
+        Initialize the cache, connecting to Redis if REDIS_URL is configured.
+        
+        Args:
+            maxsize: Maximum number of vectors held by the in-process fallback
+        """
+        self.maxsize = maxsize
+        self._local: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        # Batches read and write the LRU from worker threads concurrently
+        self._local_lock = threading.Lock()
+        self._redis = None
+        
+        redis_url = os.getenv('REDIS_URL')
+        if redis_url:
+            try:
+                import redis
+                self._redis = redis.Redis.from_url(redis_url)
+                logger.info("Using Redis for the embedding cache")
+            except Exception as e:
+                logger.warning(f"Redis unavailable for embedding cache, using in-process cache: {str(e)}")
+    
+    @staticmethod
+    def make_key(model_name: str, text: str) -> str:
+        """Build the cache key for a chunk; trivial whitespace/case differences share a key"""
+        normalized = unicodedata.normalize("NFKC", text).strip().lower()
+        digest = hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+        return f"emb:{model_name}:{digest}"
+    
+    def get_many(self, keys: List[str]) -> List[Optional[np.ndarray]]:
+        """Look up vectors for keys, returning None for misses"""
+        if self._redis is not None:
+            try:
+                return [
+                    np.frombuffer(value, dtype=np.float32) if value is not None else None
+                    for value in self._redis.mget(keys)
+                ]
+            except Exception as e:
+                logger.warning(f"Embedding cache lookup failed: {str(e)}")
+                return [None] * len(keys)
+        
+        results = []
+        with self._local_lock:
+            for key in keys:
+                value = self._local.get(key)
+                if value is not None:
+                    self._local.move_to_end(key)
+                results.append(value)
+        return results
+    
+    def set_many(self, vectors: Dict[str, np.ndarray]) -> None:
+        """Store vectors by key"""
+        if not vectors:
+            return
+        
+        if self._redis is not None:
+            try:
+                pipe = self._redis.pipeline(transaction=False)
+                for key, vector in vectors.items():
+                    pipe.set(key, np.asarray(vector, dtype=np.float32).tobytes(), ex=REDIS_TTL_SECONDS)
+                pipe.execute()
+            except Exception as e:
+                logger.warning(f"Embedding cache store failed: {str(e)}")
+            return
+        
+        with self._local_lock:
+            for key, vector in vectors.items():
+                self._local[key] = vector
+                self._local.move_to_end(key)
+            while len(self._local) > self.maxsize:
+                self._local.popitem(last=False)
+
+
+# Create a global instance
+embedding_cache = EmbeddingCache(maxsize=int(os.getenv('EMBEDDING_CACHE_SIZE', 10000)))
@@ -6,11 +6,96 @@ with keyword matching for improved search relevance.
 """
 
 import logging
-from typing import List, Dict, Any, Optional
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import List, Dict, Any, Iterable, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+try:
+    import ahocorasick
+except ImportError:  # Optional; the regex matcher is used instead
+    ahocorasick = None
 
 logger = logging.getLogger(__name__)
 
 
+class PreparedQuery(NamedTuple):
+    """Query-derived values shared by every result scored against that query"""
+    words: Tuple[str, ...]
+    lower: str
+    # One whole-word pattern per distinct word, with its word id
+    word_patterns: Tuple[Tuple["re.Pattern[str]", int], ...]
+    # Distinct words in pattern order, and each word's index in that order
+    word_ids: Dict[str, int]
+    # Aho-Corasick automaton over the distinct words, when pyahocorasick is installed
+    automaton: Any
+
+
+@lru_cache(maxsize=1024)
+def _prepare_query(query_text: str) -> PreparedQuery:
+    """
+    Lowercase and split a query and compile its word patterns, once per
+    distinct query text.
+    
+    Each pattern matches every whole-word occurrence of one query word, so
+    "cat" does not match inside "category". The patterns are zero-width, so
+    occurrences that overlap another word's (like "a" inside "a.b") or the
+    same word's are all found.
+    """
+    query_lower = query_text.lower()
+    words = tuple(query_lower.split())
+    alternatives = sorted(set(words), key=len, reverse=True)
+    word_ids = {word: i for i, word in enumerate(alternatives)}
+    word_patterns = tuple(
+        (re.compile(r'(?<!\w)(?=' + re.escape(word) + r'(?!\w))'), word_id)
+        for word, word_id in word_ids.items()
+    )
+    
+    automaton = None
+    if ahocorasick is not None and words:
+        automaton = ahocorasick.Automaton()
+        for word, word_id in word_ids.items():
+            automaton.add_word(word, (word_id, len(word)))
+        automaton.make_automaton()
+    
+    return PreparedQuery(words, query_lower, word_patterns, word_ids, automaton)
+
+
+def _is_word_char(char: str) -> bool:
+    """Match the regex \\w class for a single character"""
+    return char.isalnum() or char == '_'
+
+
+def _find_matches(query: PreparedQuery, text: str) -> List[Tuple[int, int]]:
+    """
+    List (start position, word id) for whole-word query word occurrences in
+    text, in text order.
+    
+    The Aho-Corasick automaton reports every occurrence of every word in one
+    linear pass; occurrences inside longer words are dropped afterwards. The
+    regex fallback applies the same word boundaries in its patterns, one pass
+    per word, so both find exactly the same matches.
+    """
+    if query.automaton is not None:
+        last = len(text) - 1
+        return sorted(
+            (end - length + 1, word_id)
+            for end, (word_id, length) in query.automaton.iter(text)
+            if (end == last or not _is_word_char(text[end + 1]))
+            and (end - length < 0 or not _is_word_char(text[end - length]))
+        )
+    return sorted(
+        (match.start(), word_id)
+        for pattern, word_id in query.word_patterns
+        for match in pattern.finditer(text)
+    )
+
+
 class HybridSearchEngine:
     """
     Hybrid search engine that combines semantic similarity with keyword matching.
@@ -19,17 +104,78 @@ class HybridSearchEngine:
     keyword-based scoring and proximity matching to improve search relevance.
     """
     
-    def __init__(self, semantic_weight: float = 0.7, keyword_weight: float = 0.3):
+    def __init__(self, semantic_weight: float = 0.7, keyword_weight: float = 0.3,
+                 enable_cache: bool = False, cache_ttl: float = 600, cache_maxsize: int = 512):
         """
         Initialize the hybrid search engine.
         
         Args:
             semantic_weight: Weight for semantic similarity score (default: 0.7)
             keyword_weight: Weight for keyword matching score (default: 0.3)
+            enable_cache: Cache ranked results per normalized query (default: off)
+            cache_ttl: Seconds a cached result list stays valid
+            cache_maxsize: Maximum number of cached queries
         """
         self.semantic_weight = semantic_weight
         self.keyword_weight = keyword_weight
         self.proximity_distance = 50  # Characters within which words are considered close
+        
+        self.enable_cache = enable_cache
+        self.cache_ttl = cache_ttl
+        self.cache_maxsize = cache_maxsize
+        self._cache: "OrderedDict[Tuple, Tuple[float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+    
+    @staticmethod
+    def _cache_key(query_text: str, limit: int, filter_dict: Optional[Dict]) -> Optional[Tuple]:
+        """Build the result cache key, or None if the filter can't be hashed"""
+        try:
+            filters = frozenset((filter_dict or {}).items())
+            hash(filters)
+        except TypeError:
+            return None
+        return (' '.join(query_text.lower().split()), limit, filters)
+    
+    def _cache_get(self, key: Tuple) -> Optional[List[Dict[str, Any]]]:
+        """Return a copy of the cached results for key if present and fresh"""
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] >= self.cache_ttl:
+                del self._cache[key]
+                return None
+            self._cache.move_to_end(key)
+            return [dict(result) for result in entry[1]]
+    
+    def _cache_set(self, key: Tuple, results: List[Dict[str, Any]]) -> None:
+        """Store results for key, evicting the least recently used entries"""
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic(), [dict(result) for result in results])
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_maxsize:
+                self._cache.popitem(last=False)
+    
+    def invalidate(self, document_id: Optional[int] = None) -> None:
+        """
+        Drop cached results after the indexed documents change.
+        
+        Args:
+            document_id: Drop only entries that include this document. A new
+                document can belong in any query's results, so callers that
+                add documents should invalidate everything (the default).
+        """
+        with self._cache_lock:
+            if document_id is None:
+                self._cache.clear()
+                return
+            
+            stale = [
+                key for key, (_, results) in self._cache.items()
+                if any(r.get('metadata', {}).get('document_id') == document_id for r in results)
+            ]
+            for key in stale:
+                del self._cache[key]
     
     def calculate_keyword_score(self, query_text: str, document_text: str) -> float:
         """
@@ -42,85 +188,80 @@ class HybridSearchEngine:
         Returns:
             Normalized keyword score between 0 and 1+
         """
-        query_words = query_text.lower().split()
-        query_lower = query_text.lower()
-        text_lower = document_text.lower()
-        
-        if not query_words:
+        query = _prepare_query(query_text)
+        if not query.words:
             return 0.0
+        keyword, _ = self._keyword_scores(query, [document_text.lower()])
+        return float(keyword[0])
+    
+    def _keyword_scores(self, query: PreparedQuery, texts: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score already-lowercased chunk texts against a prepared, non-empty query.
+        
+        Args:
+            query: Prepared query from _prepare_query
+            texts: Lowercase chunk texts
+            
+        Returns:
+            Tuple of (normalized keyword scores, number of query words found) per text
+        """
+        total_words = len(query.word_ids)
+        
+        # Scan every chunk in one pass over a NUL-joined buffer; NUL can't
+        # occur in a query word, so matches never span two chunks
+        n = len(texts)
+        starts = np.cumsum([0] + [len(text) + 1 for text in texts[:-1]])
+        matches = _find_matches(query, '\x00'.join(texts))
         
-        keyword_score = 0.0
-        matched_words = 0
+        counts = np.zeros((n, total_words), dtype=np.int64)
+        if matches:
+            positions, word_ids = np.array(matches, dtype=np.int64).T
+            chunk_ids = np.searchsorted(starts, positions, side='right') - 1
+            np.add.at(counts, (chunk_ids, word_ids), 1)
+        else:
+            chunk_ids = np.zeros(0, dtype=np.int64)
         
-        # Check for individual word matches
-        for word in query_words:
-            if word in text_lower:
-                matched_words += 1
-                keyword_score += 1.0
+        # Distinct query words present in each chunk
+        matched = (counts > 0).sum(axis=1)
         
-        # Bonus for phrase matching (more flexible)
-        if len(query_words) > 1:
+        bonus = np.zeros(n)
+        if total_words > 1:
             # Check for exact phrase match
-            if query_lower in text_lower:
-                keyword_score += 0.5
+            phrase = np.fromiter((query.lower in text for text in texts), dtype=bool, count=n)
+            bonus[phrase] = 0.5
             # Check for partial phrase matches (words appearing close together)
-            elif matched_words >= 2:
-                proximity_bonus = self._calculate_proximity_bonus(query_words, text_lower)
-                keyword_score += proximity_bonus
+            for i in np.flatnonzero(~phrase & (matched >= 2)):
+                lo, hi = np.searchsorted(chunk_ids, [i, i + 1])
+                bonus[i] = self._proximity_sweep(matches[lo:hi])
         
-        # Normalize keyword score
-        return keyword_score / len(query_words)
+        return (matched + bonus) / total_words, matched
     
-    def _calculate_proximity_bonus(self, query_words: List[str], text_lower: str) -> float:
+    def _proximity_sweep(self, matches: Iterable[Tuple[int, Any]]) -> float:
         """
-        Calculate proximity bonus for words appearing close together.
+        Return the proximity bonus for (position, word) matches in text order.
         
-        Args:
-            query_words: List of query words
-            text_lower: Lowercase document text
-            
-        Returns:
-            Proximity bonus score
-        """
-        # Find positions of each word in the text
-        words_found = []
-        for word in query_words:
-            word_positions = []
-            start = 0
-            while True:
-                pos = text_lower.find(word, start)
-                if pos == -1:
-                    break
-                word_positions.append(pos)
-                start = pos + 1
-            if word_positions:
-                words_found.append((word, word_positions))
-        
-        # Check if words appear within proximity distance of each other
-        proximity_bonus = 0.0
-        if len(words_found) >= 2:
-            proximity_bonus_applied = False
-            for i, (word1, positions1) in enumerate(words_found):
-                for j, (word2, positions2) in enumerate(words_found):
-                    if i != j and not proximity_bonus_applied:
-                        for pos1 in positions1:
-                            for pos2 in positions2:
-                                if abs(pos1 - pos2) <= self.proximity_distance:
-                                    proximity_bonus = 0.3  # Proximity bonus
-                                    proximity_bonus_applied = True
-                                    break
-                            if proximity_bonus_applied:
-                                break
-                    if proximity_bonus_applied:
-                        break
-        
-        return proximity_bonus
-    
-    def calculate_hybrid_score(self, semantic_score: float, keyword_score: float, 
-                             matched_words: int, total_words: int) -> float:
+        The nearest earlier match of a different word is either the previous
+        match, or (if that was the same word) the last match before the current
+        run of that word.
+        """
+        prev_pos, prev_word = None, None
+        prev_other_pos = None
+        for pos, word in matches:
+            nearest = prev_pos if word != prev_word else prev_other_pos
+            if nearest is not None and pos - nearest <= self.proximity_distance:
+                return 0.3  # Proximity bonus
+            if word != prev_word:
+                prev_other_pos = prev_pos
+            prev_pos, prev_word = pos, word
+        
+        return 0.0
+    
+    def calculate_hybrid_score(self, semantic_score, keyword_score, matched_words, total_words: int):
         """
         Calculate the final hybrid score combining semantic and keyword scores.
         
+        Takes single values or numpy arrays of them (scored element-wise).
+        
         Args:
             semantic_score: Semantic similarity score
             keyword_score: Keyword matching score
@@ -130,61 +271,65 @@ class HybridSearchEngine:
         Returns:
             Combined hybrid score
         """
-        # If all words are found, give more weight to keyword score
-        if matched_words == total_words:
-            # 60% semantic, 40% keyword for perfect keyword matches
-            return (0.6 * semantic_score) + (0.4 * keyword_score)
-        else:
-            # Use default weighting for partial matches
-            return (self.semantic_weight * semantic_score) + (self.keyword_weight * keyword_score)
+        # If all words are found, 60% semantic / 40% keyword; default weighting otherwise
+        hybrid = np.where(
+            np.equal(matched_words, total_words),
+            0.6 * np.asarray(semantic_score) + 0.4 * np.asarray(keyword_score),
+            self.semantic_weight * np.asarray(semantic_score) + self.keyword_weight * np.asarray(keyword_score),
+        )
+        return hybrid if hybrid.ndim else float(hybrid)
     
-    def rerank_results(self, query_text: str, semantic_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def rerank_results(self, query_text: str, semantic_results: List[Dict[str, Any]],
+                       limit: Optional[int] = None) -> List[Dict[str, Any]]:
         """
         Rerank semantic search results using hybrid scoring.
         
         Args:
             query_text: The search query
             semantic_results: List of semantic search results
+            limit: Optional number of top results to return; all are returned if None
             
         Returns:
             Reranked results with hybrid scores
         """
-        query_words = query_text.lower().split()
-        total_words = len(query_words)
+        # Query-level values are the same for every result (and for repeat
+        # searches), so they come from the cache
+        query = _prepare_query(query_text)
         
-        if not query_words:
+        if not query.words:
             return semantic_results
         
-        hybrid_results = []
+        if not semantic_results:
+            return []
         
-        for result in semantic_results:
-            document_text = result.get('text', '')
-            semantic_score = result.get('score', 0.0)
-            
-            # Calculate keyword score
-            keyword_score = self.calculate_keyword_score(query_text, document_text)
-            
-            # Count matched words for weighting decision
-            matched_words = sum(1 for word in query_words if word in document_text.lower())
-            
-            # Calculate hybrid score
-            hybrid_score = self.calculate_hybrid_score(
-                semantic_score, keyword_score, matched_words, total_words
-            )
-            
-            # Create enhanced result
-            hybrid_result = {
-                **result,
-                'score': hybrid_score,
-                'semantic_score': semantic_score,
-                'keyword_score': keyword_score
-            }
-            hybrid_results.append(hybrid_result)
+        n = len(semantic_results)
+        keyword, matched = self._keyword_scores(
+            query, [result.get('text', '').lower() for result in semantic_results]
+        )
+        semantic = np.fromiter((result.get('score', 0.0) for result in semantic_results), dtype=np.float64, count=n)
+        hybrid = self.calculate_hybrid_score(semantic, keyword, matched, len(query.word_ids))
         
-        # Sort by hybrid score (descending)
-        hybrid_results.sort(key=lambda x: x['score'], reverse=True)
+        # Only the top `limit` results are kept, so partition them off in
+        # O(n) and sort just those; everything tied with the cutoff score is
+        # kept as a candidate so ties still resolve in semantic order
+        order = np.arange(n)
+        if limit is not None and limit < n:
+            if limit <= 0:
+                return []
+            cutoff = np.partition(-hybrid, limit - 1)[limit - 1]
+            order = np.flatnonzero(-hybrid <= cutoff)
         
-        return hybrid_results
+        # Sort by hybrid score (descending); stable so ties keep semantic order
+        top = order[np.argsort(-hybrid[order], kind='stable')][:limit]
+        return [
+            {
+                **semantic_results[i],
+                'score': float(hybrid[i]),
+                'semantic_score': semantic_results[i].get('score', 0.0),
+                'keyword_score': float(keyword[i])
+            }
+            for i in top
+        ]
     
     def search(self, query_text: str, semantic_search_func, limit: int = 5, 
                filter_dict: Optional[Dict] = None) -> List[Dict[str, Any]]:
@@ -200,7 +345,29 @@ class HybridSearchEngine:
         Returns:
             Hybrid search results
         """
+        cache_key = self._cache_key(query_text, limit, filter_dict) if self.enable_cache else None
+        if cache_key is not None:
+            cached = self._cache_get(cache_key)
+            if cached is not None:
+                return cached
+        
         try:
+            # A single-word query has no phrase or proximity signal to rerank on,
+            # so skip the over-fetch and return the semantic ranking as is
+            query = _prepare_query(query_text)
+            if len(query.word_ids) <= 1:
+                results = [
+                    {
+                        **result,
+                        'semantic_score': result.get('score', 0.0),
+                        'keyword_score': 1.0 if query.words and _find_matches(query, result.get('text', '').lower()) else 0.0
+                    }
+                    for result in semantic_search_func(query_text, limit, filter_dict)
+                ]
+                if cache_key is not None:
+                    self._cache_set(cache_key, results)
+                return results
+            
             # Get more semantic results for better reranking
             # Use limit*4 to ensure we capture relevant chunks that might rank lower semantically
             semantic_limit = max(limit * 4, 20)
@@ -209,11 +376,11 @@ class HybridSearchEngine:
             if not semantic_results:
                 return []
             
-            # Rerank using hybrid scoring
-            hybrid_results = self.rerank_results(query_text, semantic_results)
-            
-            # Return top results
-            return hybrid_results[:limit]
+            # Rerank using hybrid scoring, keeping only the top results
+            top_results = self.rerank_results(query_text, semantic_results, limit)
+            if cache_key is not None:
+                self._cache_set(cache_key, top_results)
+            return top_results
             
         except Exception as e:
             logger.error(f"Failed to perform hybrid search: {str(e)}")
@@ -221,5 +388,9 @@ class HybridSearchEngine:
             return semantic_search_func(query_text, limit, filter_dict)
 
 
-# Create a global instance with default settings
-hybrid_search_engine = HybridSearchEngine() 
\ No newline at end of file
+# Create a global instance; the result cache is opt-in via SEARCH_CACHE_ENABLED
+hybrid_search_engine = HybridSearchEngine(
+    enable_cache=os.getenv('SEARCH_CACHE_ENABLED', 'false').lower() == 'true',
+    cache_ttl=float(os.getenv('SEARCH_CACHE_TTL', 600)),
+    cache_maxsize=int(os.getenv('SEARCH_CACHE_SIZE', 512)),
+) 
\ No newline at end of file
@@ -13,8 +13,79 @@ from typing import Optional, List, Dict, Any
 from playwright.async_api import Page
 import urllib.parse
 
+from .web_extractor import WebExtractor
+
 logger = logging.getLogger(__name__)
 
+# Page-side extraction; the selectors are passed in as an argument so this
+# source stays the same on every call and V8 can reuse its compiled function
+_LINKEDIN_CONTENT_JS = """
+(selectors) => {
+    // One DOM walk over the union of the selectors; for each match, record
+    // it if it satisfies a higher-priority selector than the best so far, so
+    // the result is the first element of the first selector that matches
+    let best = selectors.length;
+    let element = null;
+    for (const candidate of document.querySelectorAll(selectors.join(', '))) {
+        for (let i = 0; i < best; i++) {
+            if (candidate.matches(selectors[i])) {
+                best = i;
+                element = candidate;
+                break;
+            }
+        }
+        if (best === 0) break;
+    }
+    if (element) {
+        return element.innerText || element.textContent;
+    }
+    
+    // LinkedIn-specific comprehensive extraction
+    if (window.location.hostname.includes('linkedin.com')) {
+        let linkedinContent = [];
+        
+        // Get profile name and headline
+        const nameEl = document.querySelector('.text-heading-xlarge, .pv-text-details__left-panel h1');
+        if (nameEl) linkedinContent.push('Name: ' + nameEl.innerText.trim());
+        
+        const headlineEl = document.querySelector('.text-body-medium.break-words, .pv-text-details__left-panel .text-body-medium');
+        if (headlineEl) linkedinContent.push('Headline: ' + headlineEl.innerText.trim());
+        
+        // Get about section
+        const aboutEl = document.querySelector('.pv-about-section .pv-shared-text-with-see-more, .pv-about__summary-text');
+        if (aboutEl) linkedinContent.push('About: ' + aboutEl.innerText.trim());
+        
+        // Get experience
+        const experienceEls = document.querySelectorAll('.pv-experience-section .pv-entity__summary-info, .experience-item');
+        experienceEls.forEach((exp, i) => {
+            if (exp.innerText.trim()) {
+                linkedinContent.push(`Experience ${i+1}: ` + exp.innerText.trim());
+            }
+        });
+        
+        // Get education
+        const educationEls = document.querySelectorAll('.pv-education-section .pv-entity__summary-info, .education-item');
+        educationEls.forEach((edu, i) => {
+            if (edu.innerText.trim()) {
+                linkedinContent.push(`Education ${i+1}: ` + edu.innerText.trim());
+            }
+        });
+        
+        if (linkedinContent.length > 0) {
+            return linkedinContent.join('\\n\\n');
+        }
+    }
+    
+    // Fallback to body text
+    return document.body.innerText || document.body.textContent || '';
+}
+"""
+
+# install_extractor() defines the function on every document the page loads,
+# so extracting only sends this short call; null means it isn't installed
+_LINKEDIN_CONTENT_INIT_JS = f"window.__extractLinkedInContent = {_LINKEDIN_CONTENT_JS.strip()};"
+_LINKEDIN_CONTENT_CALL_JS = "(selectors) => window.__extractLinkedInContent ? window.__extractLinkedInContent(selectors) : null"
+
 class LinkedInExtractor:
     """Handles LinkedIn-specific content extraction"""
     
@@ -41,6 +112,9 @@ class LinkedInExtractor:
         '.feed-shared-article',
     ]
     
+    # Tried in order by extract_linkedin_content; the first match wins
+    CONTENT_SELECTORS = PROFILE_SELECTORS[:9] + POST_SELECTORS[:2] + PROFILE_SELECTORS[9:]
+    
     @staticmethod
     def is_linkedin_url(url: str) -> bool:
         """Check if the URL is a LinkedIn URL"""
@@ -61,17 +135,17 @@ class LinkedInExtractor:
         """
         try:
             parsed_url = urllib.parse.urlparse(url)
-            cookies_list = []
-            
-            for cookie_pair in cookies_string.split(';'):
-                if '=' in cookie_pair:
-                    name, value = cookie_pair.strip().split('=', 1)
-                    cookies_list.append({
-                        'name': name.strip(),
-                        'value': value.strip(),
-                        'domain': '.linkedin.com',
-                        'path': '/'
-                    })
+            # partition() splits on the first '=' and reports whether there was one
+            cookies_list = [
+                {
+                    'name': name.strip(),
+                    'value': value.strip(),
+                    'domain': '.linkedin.com',
+                    'path': '/'
+                }
+                for name, separator, value in (pair.partition('=') for pair in cookies_string.split(';'))
+                if separator
+            ]
             
             # Set cookies in the browser context
             await page.context.add_cookies(cookies_list)
@@ -98,18 +172,8 @@ class LinkedInExtractor:
             # LinkedIn often blocks bots, use minimal wait
             await page.goto(url, wait_until="domcontentloaded", timeout=15000)
             
-            # Wait a bit for dynamic content to load
-            await page.wait_for_timeout(3000)
-            
-            # Try to scroll down to load more content (for sites with lazy loading)
-            await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-            await page.wait_for_timeout(2000)
-            
-            # Wait for main content to appear (with fallback)
-            try:
-                await page.wait_for_selector("main, article, .content, #content", timeout=10000)
-            except Exception:
-                pass  # Continue if no main content selector found
+            # Wait for dynamic content on signals rather than fixed sleeps
+            await WebExtractor.wait_for_content(page, "main, article, .content, #content")
                 
             return True
             
@@ -118,7 +182,18 @@ class LinkedInExtractor:
             return False
     
     @staticmethod
-    async def extract_linkedin_content(page: Page) -> str:
+    async def install_extractor(page: Page) -> None:
+        """
+        Install the content extraction function on a page ahead of navigation,
+        so extract_linkedin_content() doesn't ship its source on every call.
+        
+        Args:
+            page: Playwright page instance, before goto()
+        """
+        await page.add_init_script(_LINKEDIN_CONTENT_INIT_JS)
+    
+    @classmethod
+    async def extract_linkedin_content(cls, page: Page) -> str:
         """
         Extract content from LinkedIn page using LinkedIn-specific selectors
         
@@ -130,74 +205,10 @@ class LinkedInExtractor:
         """
         try:
             # Try LinkedIn-specific extraction first
-            article_text = await page.evaluate("""
-                () => {
-                    // Try different selectors for article content
-                    const selectors = [
-                        // LinkedIn-specific selectors
-                        '.pv-text-details__left-panel',
-                        '.pv-top-card-profile-picture__container + div',
-                        '.text-heading-xlarge',
-                        '.text-body-medium',
-                        '.pv-shared-text-with-see-more',
-                        '.pv-about-section',
-                        '.pv-profile-section',
-                        '.pv-experience-section',
-                        '.pv-education-section',
-                        '.feed-shared-update-v2',
-                        '.share-update-card',
-                        '.profile-section-card',
-                        '[data-field="experience_company"]',
-                        '[data-field="experience_title"]',
-                    ];
-                    
-                    for (const selector of selectors) {
-                        const element = document.querySelector(selector);
-                        if (element) {
-                            return element.innerText || element.textContent;
-                        }
-                    }
-                    
-                    // LinkedIn-specific comprehensive extraction
-                    if (window.location.hostname.includes('linkedin.com')) {
-                        let linkedinContent = [];
-                        
-                        // Get profile name and headline
-                        const nameEl = document.querySelector('.text-heading-xlarge, .pv-text-details__left-panel h1');
-                        if (nameEl) linkedinContent.push('Name: ' + nameEl.innerText.trim());
-                        
-                        const headlineEl = document.querySelector('.text-body-medium.break-words, .pv-text-details__left-panel .text-body-medium');
-                        if (headlineEl) linkedinContent.push('Headline: ' + headlineEl.innerText.trim());
-                        
-                        // Get about section
-                        const aboutEl = document.querySelector('.pv-about-section .pv-shared-text-with-see-more, .pv-about__summary-text');
-                        if (aboutEl) linkedinContent.push('About: ' + aboutEl.innerText.trim());
-                        
-                        // Get experience
-                        const experienceEls = document.querySelectorAll('.pv-experience-section .pv-entity__summary-info, .experience-item');
-                        experienceEls.forEach((exp, i) => {
-                            if (exp.innerText.trim()) {
-                                linkedinContent.push(`Experience ${i+1}: ` + exp.innerText.trim());
-                            }
-                        });
-                        
-                        // Get education
-                        const educationEls = document.querySelectorAll('.pv-education-section .pv-entity__summary-info, .education-item');
-                        educationEls.forEach((edu, i) => {
-                            if (edu.innerText.trim()) {
-                                linkedinContent.push(`Education ${i+1}: ` + edu.innerText.trim());
-                            }
-                        });
-                        
-                        if (linkedinContent.length > 0) {
-                            return linkedinContent.join('\\n\\n');
-                        }
-                    }
-                    
-                    // Fallback to body text
-                    return document.body.innerText || document.body.textContent || '';
-                }
-            """)
+            article_text = await page.evaluate(_LINKEDIN_CONTENT_CALL_JS, cls.CONTENT_SELECTORS)
+            if article_text is None:
+                # Page wasn't set up with install_extractor(); send the whole function
+                article_text = await page.evaluate(_LINKEDIN_CONTENT_JS, cls.CONTENT_SELECTORS)
             
             return article_text.strip() if article_text else ""
             
@@ -220,7 +231,8 @@ class LinkedInExtractor:
         cls, 
         page: Page, 
         url: str, 
-        cookies: Optional[str] = None
+        cookies: Optional[str] = None,
+        block_assets: bool = False
     ) -> tuple[bool, str]:
         """
         Complete LinkedIn URL processing pipeline
@@ -229,6 +241,7 @@ class LinkedInExtractor:
             page: Playwright page instance
             url: LinkedIn URL to process
             cookies: Optional cookies string for authentication
+            block_assets: Skip images, media, fonts and stylesheets while loading
             
         Returns:
             tuple: (success: bool, extracted_text: str)
@@ -245,6 +258,10 @@ class LinkedInExtractor:
                 if not success:
                     logger.warning("Failed to set LinkedIn cookies, proceeding without authentication")
             
+            if block_assets:
+                await WebExtractor.block_assets(page)
+            await cls.install_extractor(page)
+            
             # Navigate to LinkedIn URL
             if not await cls.navigate_to_linkedin(page, url):
                 return False, ""
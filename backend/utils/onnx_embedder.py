@@ -0,0 +1,152 @@
+"""
+ONNX Embedder Module
+
+This module runs a sentence-transformer exported to ONNX with dynamic INT8
+quantization through ONNX Runtime. It exposes the same encode() call the
+rest of the backend uses on SentenceTransformer, so it can be swapped in by
+pointing EMBEDDING_ONNX_PATH at a model directory. If the directory has no
+exported model yet, it is exported and quantized on first load and reused
+from disk afterwards. It can also be exported ahead of time with:
+
+    python -m utils.onnx_embedder all-mpnet-base-v2 models/all-mpnet-base-v2-int8
+"""
+
+import logging
+import os
+import sys
+from typing import Dict, List, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Matches the max_seq_length all-mpnet-base-v2 is trained with
+DEFAULT_MAX_LENGTH = 384
+
+QUANTIZED_FILE_NAME = "model_quantized.onnx"
+
+
+class OnnxEmbedder:
+    """
+    Mean-pooled, L2-normalized sentence embeddings from a quantized ONNX model.
+    """
+
+    def __init__(self, model_dir: str, max_length: int = DEFAULT_MAX_LENGTH):
+        """
+        Load the tokenizer and ONNX session from an exported model directory.
+
+        Args:
+            model_dir: Directory written by export_quantized_model()
+            max_length: Longest token sequence fed to the model
+        """
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        self.max_length = max_length
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+
+        model_path = os.path.join(model_dir, QUANTIZED_FILE_NAME)
+        if not os.path.exists(model_path):
+            model_path = os.path.join(model_dir, "model.onnx")
+
+        # CUDA is used when this onnxruntime build has it, otherwise CPU
+        available = ort.get_available_providers()
+        providers = [p for p in ("CUDAExecutionProvider", "CPUExecutionProvider") if p in available]
+        self.session = ort.InferenceSession(model_path, providers=providers)
+        self._input_names = {i.name for i in self.session.get_inputs()}
+        logger.info(f"Loaded ONNX embedding model from {model_path} ({', '.join(providers)})")
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32, **kwargs) -> np.ndarray:
+        """
+        Embed one sentence or a list of sentences.
+
+        Returns a 1-D vector for a single string and a 2-D array for a list,
+        like SentenceTransformer.encode().
+        """
+        single = isinstance(sentences, str)
+        if single:
+            sentences = [sentences]
+
+        batches = []
+        for start in range(0, len(sentences), batch_size):
+            batches.append(self._encode_batch(sentences[start:start + batch_size]))
+
+        if not batches:
+            return np.empty((0, 0), dtype=np.float32)
+
+        embeddings = np.concatenate(batches)
+        return embeddings[0] if single else embeddings
+
+    def tokenize(self, sentences: List[str]) -> Dict[str, np.ndarray]:
+        """Tokenize sentences into one padded batch, like SentenceTransformer.tokenize()"""
+        return dict(self.tokenizer(
+            sentences,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="np",
+        ))
+    
+    def _encode_batch(self, sentences: List[str]) -> np.ndarray:
+        """Tokenize one batch, run it through the model and pool it"""
+        return self.embed_tokenized(self.tokenize(sentences))
+    
+    def embed_tokenized(self, encoded: Dict[str, np.ndarray]) -> np.ndarray:
+        """Run an already tokenized batch through the model and pool it"""
+        inputs = {name: value.astype(np.int64) for name, value in encoded.items() if name in self._input_names}
+        token_embeddings = self.session.run(None, inputs)[0]
+
+        # Mean pooling over real tokens, then normalize like the Normalize module
+        mask = encoded["attention_mask"][..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+
+def export_quantized_model(model_id: str, output_dir: str) -> str:
+    """
+    Export a Hugging Face sentence-transformer to ONNX and quantize it to INT8.
+
+    Needs optimum[onnxruntime], which is only required for this one-off step.
+
+    Returns:
+        The output directory
+    """
+    from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+    from optimum.onnxruntime.configuration import AutoQuantizationConfig
+    from transformers import AutoTokenizer
+
+    if "/" not in model_id:
+        model_id = f"sentence-transformers/{model_id}"
+
+    model = ORTModelForFeatureExtraction.from_pretrained(model_id, export=True)
+    model.save_pretrained(output_dir)
+    AutoTokenizer.from_pretrained(model_id).save_pretrained(output_dir)
+
+    quantizer = ORTQuantizer.from_pretrained(output_dir)
+    # Per-channel weight scales keep MPNet's recall close to the FP32 model
+    qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=True)
+    quantizer.quantize(save_dir=output_dir, quantization_config=qconfig)
+
+    logger.info(f"Exported quantized ONNX model to {output_dir}")
+    return output_dir
+
+
+def load_or_export(model_id: str, model_dir: str) -> OnnxEmbedder:
+    """
+    Load the quantized model from model_dir, exporting it there first if missing.
+
+    The export takes minutes, so it only happens once per model directory.
+    """
+    if not os.path.exists(os.path.join(model_dir, QUANTIZED_FILE_NAME)):
+        logger.info(f"No quantized ONNX model in {model_dir}, exporting {model_id}")
+        export_quantized_model(model_id, model_dir)
+    return OnnxEmbedder(model_dir)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        print("Usage: python -m utils.onnx_embedder <model_id> <output_dir>")
+        sys.exit(1)
+    logging.basicConfig(level=logging.INFO)
+    export_quantized_model(sys.argv[1], sys.argv[2])
@@ -2,12 +2,41 @@ import PyPDF2
 from langchain_text_splitters import CharacterTextSplitter
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Union
 import io
+import mmap
+import os
 import re
+import threading
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:  # Optional; PyPDF2 is used instead
+    pdfium = None
+
+try:
+    import semchunk
+except ImportError:  # Optional; the character splitter is used instead
+    semchunk = None
 
 logger = logging.getLogger(__name__)
 
+# PDFium is not thread-safe; this serializes it when parsing runs on threads
+_PDFIUM_LOCK = threading.Lock()
+
+# PDFs with at least this many pages are split into page ranges of
+# PAGES_PER_TASK that worker processes extract in parallel
+PARALLEL_PAGE_THRESHOLD = 8
+PAGES_PER_TASK = 16
+
+# clean_text pattern, compiled once rather than looked up per call
+_CAMEL_CASE_RE = re.compile(r'([a-z])([A-Z])')
+
+# Chunk size in embedding-model tokens, and the share of each chunk
+# repeated at the start of the next
+CHUNK_TOKENS = 256
+CHUNK_OVERLAP = 0.2
+
 class PDFProcessor:
     def __init__(self):
         self.text_splitter = RecursiveCharacterTextSplitter(
@@ -15,37 +44,101 @@ class PDFProcessor:
             chunk_overlap=150,  # More overlap for better continuity
             separators=["\n\n", "\n", ". ", "? ", "! ", " ", ""]
         )
+        # Built on first use so the tokenizer only loads where chunking happens
+        self._token_chunker = None
+    
+    def _get_token_chunker(self):
+        """
+        semchunk chunker that sizes chunks in the embedding model's tokens, or
+        None when semchunk or the tokenizer is unavailable
+        """
+        if self._token_chunker is None:
+            self._token_chunker = False
+            if semchunk is not None:
+                model_name = os.getenv('EMBEDDING_MODEL', 'all-mpnet-base-v2')
+                if '/' not in model_name:
+                    model_name = f"sentence-transformers/{model_name}"
+                try:
+                    self._token_chunker = semchunk.chunkerify(model_name, CHUNK_TOKENS)
+                except Exception as e:
+                    logger.warning(f"Token chunker unavailable, using the character splitter: {str(e)}")
+        return self._token_chunker or None
     
-    def extract_text_from_pdf(self, pdf_content: bytes) -> str:
-        """Extract text from PDF content"""
+    def extract_text_from_pdf(self, source: Union[str, bytes]) -> str:
+        """Extract text from a PDF file path or PDF content"""
         try:
-            pdf_file = io.BytesIO(pdf_content)
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
+            page_texts = None
+            if pdfium is not None:
+                try:
+                    page_texts = self._extract_pages_pdfium(source)
+                except Exception as e:
+                    logger.warning(f"PDFium could not parse PDF, falling back to PyPDF2: {str(e)}")
             
-            text = ""
-            for page_num, page in enumerate(pdf_reader.pages):
-                page_text = page.extract_text()
-                if page_text:
-                    text += f"\n--- Page {page_num + 1} ---\n"
-                    text += page_text
+            if page_texts is None:
+                page_texts = self._extract_pages_pypdf2(source)
             
-            if not text.strip():
-                raise Exception("No text could be extracted from the PDF")
-            
-            logger.info(f"Extracted {len(text)} characters from PDF")
-            return text.strip()
+            return self._join_pages(page_texts)
             
         except Exception as e:
             logger.error(f"Failed to extract text from PDF: {str(e)}")
             raise
     
+    def _extract_pages_pdfium(self, source: Union[str, bytes], start: int = 0,
+                              stop: Optional[int] = None) -> List[str]:
+        """Extract the text of pages start..stop with PDFium, which parses in native code"""
+        with _PDFIUM_LOCK:
+            pdf = pdfium.PdfDocument(source)
+            try:
+                stop = len(pdf) if stop is None else min(stop, len(pdf))
+                page_texts = []
+                for index in range(start, stop):
+                    page = pdf[index]
+                    textpage = page.get_textpage()
+                    page_texts.append(textpage.get_text_bounded())
+                    textpage.close()
+                    page.close()
+                return page_texts
+            finally:
+                pdf.close()
+    
+    def _extract_pages_pypdf2(self, source: Union[str, bytes]) -> List[str]:
+        """Extract the text of each page with PyPDF2"""
+        if isinstance(source, bytes):
+            return [page.extract_text() for page in PyPDF2.PdfReader(io.BytesIO(source)).pages]
+        
+        # Memory-map the file so only the pages the parser touches get read in
+        with open(source, "rb") as pdf_file, \
+                mmap.mmap(pdf_file.fileno(), 0, access=mmap.ACCESS_READ) as pdf_map:
+            return [page.extract_text() for page in PyPDF2.PdfReader(pdf_map).pages]
+    
+    def _join_pages(self, page_texts: List[str]) -> str:
+        """Join page texts under page markers, skipping empty pages"""
+        # One join instead of growing a string page by page
+        text = "".join([
+            f"\n--- Page {page_num + 1} ---\n{page_text}"
+            for page_num, page_text in enumerate(page_texts)
+            if page_text
+        ])
+        
+        if not text.strip():
+            raise Exception("No text could be extracted from the PDF")
+        
+        logger.info(f"Extracted {len(text)} characters from PDF")
+        return text.strip()
+    
     def chunk_text(self, text: str) -> List[str]:
         """Split text into chunks with better boundaries"""
         try:
             # Clean the text first
             text = self.clean_text(text)
 
-            chunks = self.text_splitter.split_text(text)
+            # Token-sized chunks fill the embedder's sequence length evenly;
+            # the character splitter is the fallback
+            token_chunker = self._get_token_chunker()
+            if token_chunker is not None:
+                chunks = token_chunker(text, overlap=CHUNK_OVERLAP)
+            else:
+                chunks = self.text_splitter.split_text(text)
             logger.info(f"Split text into {len(chunks)} chunks")
             return chunks
         except Exception as e:
@@ -54,20 +147,23 @@ class PDFProcessor:
 
     def clean_text(self, text: str) -> str:
         """Clean extracted text for better processing"""
-        # Remove excessive whitespace
-        text = re.sub(r'\s+', ' ', text)
+        # Remove excessive whitespace; str.split() splits on the same characters
+        # as \s+ in a single C pass. A trailing run still becomes one space,
+        # since it can complete a "- " below
+        collapsed = ' '.join(text.split())
+        text = collapsed + ' ' if text[-1:].isspace() else collapsed
         
         # Fix common PDF extraction issues
         text = text.replace('- ', '')  # Remove hyphen
-        text = re.sub(r'([a-z])([A-Z])', r'\1 \2', text)  # Add space between words
+        text = _CAMEL_CASE_RE.sub(r'\1 \2', text)  # Add space between words
         
         return text.strip()    
     
-    def process_pdf_to_chunks(self, pdf_content: bytes) -> List[str]:
-        """Process PDF content and return text chunks"""
+    def process_pdf_to_chunks(self, source: Union[str, bytes]) -> List[str]:
+        """Process a PDF file path or PDF content and return text chunks"""
         try:
             # Extract text
-            text = self.extract_text_from_pdf(pdf_content)
+            text = self.extract_text_from_pdf(source)
             
             # Split into chunks
             chunks = self.chunk_text(text)
@@ -79,4 +175,38 @@ class PDFProcessor:
             raise
 
 # Global instance
-pdf_processor = PDFProcessor() 
\ No newline at end of file
+pdf_processor = PDFProcessor()
+
+def process_pdf_file(file_path: str) -> List[str]:
+    """
+    Module-level entry point for process pools: workers import this module
+    and use their own global processor, so nothing heavy is pickled per call.
+    """
+    return pdf_processor.process_pdf_to_chunks(file_path)
+
+def count_pdf_pages(file_path: str) -> int:
+    """
+    Page count of a PDF, used to decide whether to split it across workers.
+    Returns 0 when PDFium is unavailable or can't open the file, so the
+    caller parses it in one task with the full PyPDF2 fallback.
+    """
+    if pdfium is None:
+        return 0
+    try:
+        with _PDFIUM_LOCK:
+            pdf = pdfium.PdfDocument(file_path)
+            try:
+                return len(pdf)
+            finally:
+                pdf.close()
+    except Exception as e:
+        logger.warning(f"PDFium could not open PDF to count pages: {str(e)}")
+        return 0
+
+def extract_pdf_pages(file_path: str, start: int, stop: int) -> List[str]:
+    """Process pool entry point: text of pages start..stop of a PDF"""
+    return pdf_processor._extract_pages_pdfium(file_path, start, stop)
+
+def chunk_pdf_pages(page_texts: List[str]) -> List[str]:
+    """Process pool entry point: join page texts in order and chunk them"""
+    return pdf_processor.chunk_text(pdf_processor._join_pages(page_texts)) 
\ No newline at end of file
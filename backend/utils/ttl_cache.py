@@ -0,0 +1,46 @@
+"""
+TTL Cache Module
+
+This module provides a small time-based memoization decorator for cheap but
+frequently polled values such as health checks and pool statistics.
+"""
+
+import functools
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
+
+
+def ttl_cache(seconds: float) -> Callable:
+    """
+    Memoize a function's return value per argument tuple for a fixed time.
+    
+    Args:
+        seconds: How long a computed value stays valid
+        
+    Returns:
+        Decorator that wraps a synchronous function
+    """
+    def decorator(func: Callable) -> Callable:
+        cache: Dict[Tuple, Tuple[float, Any]] = {}
+        lock = threading.Lock()
+        
+        @functools.wraps(func)
+        def wrapper(*args):
+            now = time.monotonic()
+            entry = cache.get(args)
+            if entry is not None and now - entry[0] < seconds:
+                return entry[1]
+            
+            with lock:
+                entry = cache.get(args)
+                if entry is not None and now - entry[0] < seconds:
+                    return entry[1]
+                value = func(*args)
+                cache[args] = (time.monotonic(), value)
+                return value
+        
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    
+    return decorator
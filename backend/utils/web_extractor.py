@@ -6,14 +6,73 @@ This module handles general web content extraction for non-LinkedIn sites includ
 - Blog post extraction
 - News content extraction
 - Generic content selectors
+- Browserless fetching and PDF rendering for static pages
 """
 
+import asyncio
 import logging
-from typing import Optional
-from playwright.async_api import Page
+import time
+import urllib.parse
+from collections import defaultdict
+from typing import List, Optional
+import httpx
+from selectolax.parser import HTMLParser
+from playwright.async_api import BrowserContext, Page
 
 logger = logging.getLogger(__name__)
 
+# Page-side extraction; the selectors are passed in as an argument so this
+# source stays the same on every call
+_WEB_CONTENT_JS = """
+(selectors) => {
+    // One DOM walk over the union of the selectors; for each match, record
+    // it if it satisfies a higher-priority selector than the best so far, so
+    // the result is the first element of the first selector that matches
+    let best = selectors.length;
+    let element = null;
+    for (const candidate of document.querySelectorAll(selectors.join(', '))) {
+        for (let i = 0; i < best; i++) {
+            if (candidate.matches(selectors[i])) {
+                best = i;
+                element = candidate;
+                break;
+            }
+        }
+        if (best === 0) break;
+    }
+    if (element) {
+        return element.innerText || element.textContent;
+    }
+    
+    // Fallback to body text
+    return document.body.innerText || document.body.textContent || '';
+}
+"""
+
+# install_extractor() defines the function on every document the page loads,
+# so extracting only sends this short call; null means it isn't installed
+_WEB_CONTENT_INIT_JS = f"window.__extractWebContent = {_WEB_CONTENT_JS.strip()};"
+_WEB_CONTENT_CALL_JS = "(selectors) => window.__extractWebContent ? window.__extractWebContent(selectors) : null"
+
+class DomainThrottle:
+    """Spaces out requests to the same host by at least min_interval seconds"""
+    
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._locks = defaultdict(asyncio.Lock)
+        self._last_hit = {}
+    
+    async def wait(self, url: str) -> None:
+        """Sleep until url's host may be hit again, then record the hit"""
+        host = urllib.parse.urlparse(url).netloc
+        async with self._locks[host]:
+            last_hit = self._last_hit.get(host)
+            if last_hit is not None:
+                delay = last_hit + self.min_interval - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            self._last_hit[host] = time.monotonic()
+
 class WebExtractor:
     """Handles generic web content extraction"""
     
@@ -33,6 +92,42 @@ class WebExtractor:
         '.page-content',
     ]
     
+    # Sites whose content only exists after client-side rendering
+    JS_RENDERED_DOMAINS = {
+        'twitter.com',
+        'x.com',
+        'instagram.com',
+        'facebook.com',
+        'medium.com',
+    }
+    
+    # Below this many characters a static fetch is assumed to have missed JS-rendered content
+    MIN_STATIC_TEXT_LENGTH = 100
+    
+    # Seconds to wait on the browserless fetch before falling back to Chromium
+    STATIC_FETCH_TIMEOUT = 10
+    
+    # Seconds a rendered page gets to go network-idle or show its content
+    CONTENT_WAIT_TIMEOUT = 5
+    
+    # Milliseconds lazy-loaded content gets to settle after scrolling
+    IDLE_SETTLE_TIMEOUT = 800
+    
+    # Resource types skipped when only the page text matters
+    ASSET_RESOURCE_TYPES = frozenset({'image', 'media', 'font', 'stylesheet'})
+    
+    # process_many: pages open at once, and seconds between hits on one host
+    MAX_CONCURRENT_PAGES = 10
+    DOMAIN_MIN_INTERVAL = 1.5
+    
+    @classmethod
+    def requires_browser(cls, url: str) -> bool:
+        """Check if the URL needs a full browser to render its content"""
+        host = (urllib.parse.urlparse(url).hostname or '').lower()
+        if 'linkedin.com' in host:
+            return True
+        return any(host == domain or host.endswith('.' + domain) for domain in cls.JS_RENDERED_DOMAINS)
+    
     @staticmethod
     def get_default_user_agent() -> str:
         """Get a realistic user agent for general web browsing"""
@@ -43,8 +138,68 @@ class WebExtractor:
         """Get default timeout for general web requests"""
         return 60000  # 60 seconds for general websites
     
+    @classmethod
+    async def block_assets(cls, page: Page) -> None:
+        """
+        Abort image, media, font and stylesheet requests for a page. Call it
+        before goto(); the page's text still loads, but a PDF printed from it
+        comes out unstyled and without images.
+        
+        Args:
+            page: Playwright page instance
+        """
+        async def handle(route):
+            if route.request.resource_type in cls.ASSET_RESOURCE_TYPES:
+                await route.abort()
+            else:
+                await route.continue_()
+        
+        await page.route("**/*", handle)
+    
     @staticmethod
-    async def navigate_to_url(page: Page, url: str) -> bool:
+    async def install_extractor(page: Page) -> None:
+        """
+        Install the content extraction function on a page ahead of navigation,
+        so extract_web_content() doesn't ship its source on every call.
+        
+        Args:
+            page: Playwright page instance, before goto()
+        """
+        await page.add_init_script(_WEB_CONTENT_INIT_JS)
+    
+    @classmethod
+    async def wait_for_content(cls, page: Page, selector: str) -> None:
+        """
+        Wait for a loaded page to settle: until the network goes idle or an
+        element matching selector appears, whichever comes first, then scroll
+        to the bottom and give lazy-loaded content one idle period.
+        
+        Args:
+            page: Playwright page instance, after goto()
+            selector: Selector for the page's main content
+        """
+        timeout_ms = cls.CONTENT_WAIT_TIMEOUT * 1000
+        waiters = [
+            asyncio.ensure_future(page.wait_for_load_state("networkidle", timeout=timeout_ms)),
+            asyncio.ensure_future(page.wait_for_selector(selector, timeout=timeout_ms)),
+        ]
+        try:
+            done, _ = await asyncio.wait(waiters, timeout=cls.CONTENT_WAIT_TIMEOUT, return_when=asyncio.FIRST_COMPLETED)
+            for waiter in done:
+                waiter.exception()  # A wait that failed just means no signal; carry on
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+        
+        # Try to scroll down to load more content (for sites with lazy loading)
+        await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
+        await page.evaluate(
+            "(timeout) => new Promise(resolve => requestIdleCallback(() => resolve(), { timeout }))",
+            cls.IDLE_SETTLE_TIMEOUT,
+        )
+    
+    @classmethod
+    async def navigate_to_url(cls, page: Page, url: str) -> bool:
         """
         Navigate to a general URL with appropriate settings
         
@@ -58,18 +213,8 @@ class WebExtractor:
         try:
             await page.goto(url, wait_until="domcontentloaded", timeout=60000)
             
-            # Wait a bit for dynamic content to load
-            await page.wait_for_timeout(3000)
-            
-            # Try to scroll down to load more content (for sites with lazy loading)
-            await page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-            await page.wait_for_timeout(2000)
-            
-            # Wait for main content to appear (with fallback)
-            try:
-                await page.wait_for_selector("main, article, .content, #content, [data-testid='storyContent']", timeout=10000)
-            except Exception:
-                pass  # Continue if no main content selector found
+            # Wait for dynamic content on signals rather than fixed sleeps
+            await cls.wait_for_content(page, "main, article, .content, #content, [data-testid='storyContent']")
                 
             return True
             
@@ -77,8 +222,8 @@ class WebExtractor:
             logger.error(f"Failed to navigate to URL: {str(e)}")
             return False
     
-    @staticmethod
-    async def extract_web_content(page: Page) -> str:
+    @classmethod
+    async def extract_web_content(cls, page: Page) -> str:
         """
         Extract content from a general web page using common selectors
         
@@ -89,35 +234,10 @@ class WebExtractor:
             str: Extracted text content
         """
         try:
-            article_text = await page.evaluate("""
-                () => {
-                    // Try different selectors for article content
-                    const selectors = [
-                        'article',
-                        '[data-testid="storyContent"]',
-                        'main',
-                        '.content',
-                        '#content',
-                        '.post-content',
-                        '.entry-content',
-                        '.article-content',
-                        '.story-content',
-                        '.news-content',
-                        '.blog-content',
-                        '.page-content',
-                    ];
-                    
-                    for (const selector of selectors) {
-                        const element = document.querySelector(selector);
-                        if (element) {
-                            return element.innerText || element.textContent;
-                        }
-                    }
-                    
-                    // Fallback to body text
-                    return document.body.innerText || document.body.textContent || '';
-                }
-            """)
+            article_text = await page.evaluate(_WEB_CONTENT_CALL_JS, cls.CONTENT_SELECTORS)
+            if article_text is None:
+                # Page wasn't set up with install_extractor(); send the whole function
+                article_text = await page.evaluate(_WEB_CONTENT_JS, cls.CONTENT_SELECTORS)
             
             return article_text.strip() if article_text else ""
             
@@ -126,13 +246,14 @@ class WebExtractor:
             return ""
     
     @classmethod
-    async def process_web_url(cls, page: Page, url: str) -> tuple[bool, str]:
+    async def process_web_url(cls, page: Page, url: str, block_assets: bool = False) -> tuple[bool, str]:
         """
         Complete web URL processing pipeline
         
         Args:
             page: Playwright page instance
             url: URL to process
+            block_assets: Skip images, media, fonts and stylesheets while loading
             
         Returns:
             tuple: (success: bool, extracted_text: str)
@@ -143,6 +264,10 @@ class WebExtractor:
                 'User-Agent': cls.get_default_user_agent()
             })
             
+            if block_assets:
+                await cls.block_assets(page)
+            await cls.install_extractor(page)
+            
             # Navigate to URL
             if not await cls.navigate_to_url(page, url):
                 return False, ""
@@ -154,4 +279,130 @@ class WebExtractor:
             
         except Exception as e:
             logger.error(f"Failed to process web URL: {str(e)}")
-            return False, "" 
\ No newline at end of file
+            return False, "" 
+    
+    @classmethod
+    async def process_many(
+        cls,
+        context: BrowserContext,
+        urls: List[str],
+        cookies: Optional[str] = None,
+        block_assets: bool = False,
+        max_concurrency: int = MAX_CONCURRENT_PAGES
+    ) -> List[tuple[bool, str]]:
+        """
+        Extract several URLs concurrently, each on its own page of context.
+        At most max_concurrency pages are open at once, and hits on the same
+        host are spaced DOMAIN_MIN_INTERVAL seconds apart.
+        
+        Args:
+            context: Browser context to open the pages in
+            urls: URLs to process
+            cookies: Optional cookies string for LinkedIn URLs
+            block_assets: Skip images, media, fonts and stylesheets while loading
+            max_concurrency: Most pages open at once
+            
+        Returns:
+            list: (success: bool, extracted_text: str) per URL, in input order
+        """
+        # Imported here; the LinkedIn extractor builds on this module
+        from .linkedin_extractor import LinkedInExtractor
+        
+        semaphore = asyncio.Semaphore(max_concurrency)
+        throttle = DomainThrottle(cls.DOMAIN_MIN_INTERVAL)
+        
+        async def process(url: str) -> tuple[bool, str]:
+            async with semaphore:
+                await throttle.wait(url)
+                page = await context.new_page()
+                try:
+                    if LinkedInExtractor.is_linkedin_url(url):
+                        return await LinkedInExtractor.process_linkedin_url(page, url, cookies, block_assets)
+                    return await cls.process_web_url(page, url, block_assets)
+                finally:
+                    await page.close()
+        
+        return await asyncio.gather(*(process(url) for url in urls))
+    
+    @classmethod
+    def extract_static_content(cls, html: str) -> str:
+        """
+        Extract content from static HTML using the same selectors as the browser path
+        
+        Args:
+            html: Raw HTML of the page
+            
+        Returns:
+            str: Extracted text content
+        """
+        tree = HTMLParser(html)
+        tree.strip_tags(['script', 'style', 'noscript'])
+        
+        for selector in cls.CONTENT_SELECTORS:
+            node = tree.css_first(selector)
+            if node:
+                return node.text(separator='\n', strip=True)
+        
+        # Fallback to body text
+        body = tree.body or tree.root
+        return body.text(separator='\n', strip=True) if body else ""
+    
+    @classmethod
+    def create_http_client(cls) -> httpx.AsyncClient:
+        """
+        Build the HTTP/2, connection-pooled client used for browserless fetches.
+        The app creates one at startup and shares it across requests.
+        """
+        return httpx.AsyncClient(
+            http2=True,
+            headers={'User-Agent': cls.get_default_user_agent()},
+            timeout=cls.STATIC_FETCH_TIMEOUT,
+            follow_redirects=True,
+        )
+    
+    @classmethod
+    async def process_static_url(cls, url: str, client: Optional[httpx.AsyncClient] = None) -> tuple[bool, str, Optional[bytes]]:
+        """
+        Fetch and render a page without a browser: one HTTP GET plus WeasyPrint
+        
+        Args:
+            url: URL to process
+            client: Shared HTTP client; a short-lived one is created if omitted
+            
+        Returns:
+            tuple: (success: bool, extracted_text: str, pdf_content: bytes or None)
+            success is False when the page looks JS-rendered or cannot be rendered,
+            in which case the caller should fall back to the browser pipeline
+        """
+        try:
+            from weasyprint import HTML
+        except ImportError:
+            logger.info("WeasyPrint not installed, using the browser pipeline")
+            return False, "", None
+        
+        try:
+            if client is None:
+                async with cls.create_http_client() as own_client:
+                    response = await own_client.get(url)
+            else:
+                response = await client.get(url)
+            response.raise_for_status()
+            
+            if 'html' not in response.headers.get('content-type', ''):
+                return False, "", None
+            
+            html = response.text
+            extracted_text = cls.extract_static_content(html)
+            if len(extracted_text) <= cls.MIN_STATIC_TEXT_LENGTH:
+                return False, "", None
+            
+            # WeasyPrint rendering is CPU-bound; keep it off the event loop
+            pdf_content = await asyncio.to_thread(
+                lambda: HTML(string=html, base_url=str(response.url)).write_pdf()
+            )
+            
+            return True, extracted_text, pdf_content
+            
+        except Exception as e:
+            logger.warning(f"Static fetch failed for {url}, falling back to browser: {str(e)}")
+            return False, "", None